@@ -0,0 +1,130 @@
+# ============================================================
+# 🏗 WIDTH CNN ARCHITECTURE VARIANTS (SMALLER / FASTER ON CPU)
+# ============================================================
+# The original model flattens a 14x14x128 feature map (~25k features)
+# straight into the output layer, so most weights sit in that one
+# Dense layer. The lighter variants keep the conv stack and change
+# the parts that cost the most:
+#
+#   flatten    → original model (Conv → MaxPool ×3 → Flatten → Dense)
+#   gap        → same convs, GlobalAveragePooling head (128 features)
+#   separable  → depthwise-separable convs after the first layer + GAP
+#
+# Every variant can be trained at a smaller input size (train.py
+# --img-size 96 / 64). The apps read the size back from the model's
+# input shape (inference_backend.input_size), so a model trained at
+# 96 px is fed 96 px tiles without any config change.
+#
+#   python train.py --arch gap --img-size 96 --output model/variants/gap_96.h5
+#   python architectures.py                   # trained variants, from model/arch_report.csv
+#   python architectures.py --untrained       # params / latency of fresh models only
+
+import os
+import csv
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+ARCHITECTURES = ["flatten", "gap", "separable"]
+IMG_SIZES = [128, 96, 64]
+REPORT_PATH = "model/arch_report.csv"
+REPORT_COLUMNS = ["Timestamp", "Arch", "Img_Size", "Params", "Size_KB",
+                  "Latency_ms", "Val_MAE_m", "Model_Path"]
+
+
+# ============================================================
+# 1️⃣ MODELS
+# ============================================================
+def build_model(arch="flatten", img_size=128):
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import (Input, Dense, Flatten, Conv2D, SeparableConv2D,
+                                         MaxPooling2D, GlobalAveragePooling2D, Dropout)
+
+    if arch not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture '{arch}', choose from {ARCHITECTURES}")
+
+    img_input = Input(shape=(img_size, img_size, 3))
+
+    # The first layer stays a full conv: a depthwise conv over 3 input
+    # channels saves almost nothing
+    x = Conv2D(32, (3,3), activation='relu')(img_input)# extarct edges ,pattenrs
+    x = MaxPooling2D(2,2)(x)
+    conv = SeparableConv2D if arch == "separable" else Conv2D
+    x = conv(64, (3,3), activation='relu')(x)
+    x = MaxPooling2D(2,2)(x)
+    x = conv(128, (3,3), activation='relu')(x)
+    x = MaxPooling2D(2,2)(x)
+
+    x = Flatten()(x) if arch == "flatten" else GlobalAveragePooling2D()(x)
+    x = Dropout(0.3)(x)
+
+    # Regression output stays float32 under mixed precision
+    output = Dense(1, activation="linear", dtype="float32")(x)
+    return Model(inputs=img_input, outputs=output, name=f"width_cnn_{arch}_{img_size}")
+
+
+# ============================================================
+# 2️⃣ MEASUREMENTS
+# ============================================================
+def cpu_latency_ms(model, repeats=50):
+    # Median single-tile predict time (what the GUI pays per click)
+    size = model.input_shape[1]
+    one = np.zeros((1, size, size, 3), dtype=np.float32)
+    model.predict_on_batch(one)   # warm-up / graph tracing
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.predict_on_batch(one)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+
+def append_report(arch, img_size, params, model_path, latency_ms, val_mae_m):
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    new_file = not os.path.exists(REPORT_PATH)
+    with open(REPORT_PATH, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(REPORT_COLUMNS)
+        writer.writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), arch, img_size, params,
+                         round(os.path.getsize(model_path) / 1024, 1), f"{latency_ms:.2f}",
+                         f"{val_mae_m:.3f}", model_path])
+
+
+def print_table(rows):
+    print(f"{'arch':<11}{'size px':>8}{'params':>11}{'file KB':>10}{'p50 ms':>9}{'MAE (m)':>9}")
+    for r in rows:
+        print(f"{r['Arch']:<11}{r['Img_Size']:>8}{int(r['Params']):>11,}{r['Size_KB']:>10}"
+              f"{float(r['Latency_ms']):>9.2f}{r['Val_MAE_m']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare width CNN architectures")
+    parser.add_argument("--untrained", action="store_true",
+                        help="Build every variant untrained: params / file size / latency only")
+    parser.add_argument("--img-sizes", type=int, nargs="+", default=IMG_SIZES)
+    args = parser.parse_args()
+
+    if args.untrained:
+        import tempfile
+        rows = []
+        with tempfile.TemporaryDirectory() as work:
+            for arch in ARCHITECTURES:
+                for size in args.img_sizes:
+                    model = build_model(arch, size)
+                    path = os.path.join(work, f"{arch}_{size}.h5")
+                    model.save(path)
+                    rows.append({"Arch": arch, "Img_Size": size, "Params": model.count_params(),
+                                 "Size_KB": round(os.path.getsize(path) / 1024, 1),
+                                 "Latency_ms": cpu_latency_ms(model), "Val_MAE_m": "-"})
+        print_table(rows)
+    elif not os.path.exists(REPORT_PATH):
+        print(f"⚠️ No {REPORT_PATH} yet: train a variant with "
+              f"python train.py --arch gap --img-size 96 --output model/variants/gap_96.h5")
+    else:
+        # Latest run of every (arch, size), fastest first
+        with open(REPORT_PATH, newline="") as f:
+            latest = {(r["Arch"], r["Img_Size"]): r for r in csv.DictReader(f)}
+        print_table(sorted(latest.values(), key=lambda r: float(r["Latency_ms"])))
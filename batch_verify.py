@@ -0,0 +1,262 @@
+# ============================================================
+# 🏭 HEADLESS BATCH VERIFICATION (WHOLE REGISTER, NO GUI)
+# ============================================================
+# Verifies every building of a register in one run:
+#   - images decoded / resized in parallel, each file once
+#   - identical tiles (same decoded bytes) predicted once
+#   - CNN width prediction in large batches
+#   - area / floors / tax / alert computed over whole chunks
+#   - the register is processed CHUNK_ROWS buildings at a time (decode →
+#     predict → write), so memory does not grow with the register size
+#   - results written in one transaction per chunk to the `buildings` table
+#
+# Usage:
+#   python batch_verify.py                              # whole updated_file.csv
+#   python batch_verify.py --ids B001 B002              # selected Building_IDs
+#   python batch_verify.py --coords "12.972575,77.591082"
+#   python batch_verify.py --register other.csv --batch-size 512 --workers 8
+
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import db
+import metrics
+import verify
+from dedup import content_hash
+from inference_backend import BACKENDS, input_size
+from preprocess import preprocess_images
+from register_store import Register
+from spatial_index import CoordinateIndex, parse_coordinates, COORD_TOLERANCE_M
+
+DB_PATH = db.DB_PATH
+CHUNK_ROWS = 8192   # buildings per decode → predict → write round (~400 MB of 128 px tiles)
+# Register columns a chunk needs (Zone / Ward only when the register has them)
+REGISTER_COLUMNS = ["Building_ID", "TopView_Image", "Building_Height", "Building_Type"]
+OPTIONAL_COLUMNS = ["Zone", "Ward"]
+
+
+# ============================================================
+# 1️⃣ SELECT BUILDINGS
+# ============================================================
+def select_rows(register, ids=None, coords=None, tolerance_m=COORD_TOLERANCE_M):
+    # → register row positions to verify; only Building_ID / lat / lon are read
+    rows = np.arange(len(register))
+    if ids:
+        building_ids = np.asarray(register.column("Building_ID")).astype(str)
+        rows = rows[np.isin(building_ids, [str(i) for i in ids])]
+
+    if coords:
+        lat, lon = parse_coordinates(coords)
+        index = CoordinateIndex(np.asarray(register.lat)[rows], np.asarray(register.lon)[rows])
+        pos = index.query_many(lat, lon, tolerance_m)
+        for c in np.asarray(coords)[pos < 0]:
+            print("⚠️ No building found for coordinates:", c)
+        rows = rows[np.unique(pos[pos >= 0])]
+
+    return rows
+
+
+def read_chunk(register, rows):
+    # Only the columns the pipeline uses, only for these rows
+    columns = REGISTER_COLUMNS + [c for c in OPTIONAL_COLUMNS if c in register.columns]
+    chunk = register.frame(columns, rows)
+    chunk["Latitude"] = np.asarray(register.lat)[rows]
+    chunk["Longitude"] = np.asarray(register.lon)[rows]
+    return chunk
+
+
+# ============================================================
+# 2️⃣ PARALLEL IMAGE LOADING
+# ============================================================
+def load_images(paths, workers, size=verify.IMG_SIZE):
+    # Decoded / resized on `workers` threads (preprocess.py), input order kept
+    images, ok, _ = preprocess_images(paths, size, workers)
+    return images, ok
+
+
+# ============================================================
+# 3️⃣ MUNICIPAL LOOKUP (ONE INDEX QUERY FOR ALL BUILDINGS)
+# ============================================================
+def load_municipal(municipal_path):
+    # → (floors, tax, index), or None when there is no municipal export yet
+    if not os.path.exists(municipal_path):
+        return None
+    muni = pd.read_csv(municipal_path)
+    return (muni["Floors"].to_numpy(dtype=np.float64),
+            muni["Total_Tax"].to_numpy(dtype=np.float64),
+            CoordinateIndex.from_coordinates(muni["Coordinates"]))
+
+
+def attach_municipal(df, municipal_path, tolerance_m=COORD_TOLERANCE_M, municipal=None):
+    # municipal: a load_municipal() result, to reuse one index across chunks
+    df = df.copy()
+    df["Muni_Floors"] = np.nan
+    df["Muni_Tax"] = np.nan
+
+    if municipal is None:
+        municipal = load_municipal(municipal_path)
+    if municipal is None:
+        return df
+
+    floors, tax, index = municipal
+    pos = index.query_many(df["Latitude"], df["Longitude"], tolerance_m)
+    found = pos >= 0
+    df.loc[found, "Muni_Floors"] = floors[pos[found]]
+    df.loc[found, "Muni_Tax"] = tax[pos[found]]
+    return df
+
+
+# ============================================================
+# 4️⃣ BULK DATABASE WRITE
+# ============================================================
+def write_results(results, conn):
+    if "Ward" not in results:
+        results = results.assign(Ward=None)
+    rows = results[[
+        "Building_ID", "Latitude", "Longitude", "Building_Type", "Building_Height",
+        "Predicted_Width", "Area", "Predicted_Floors", "Predicted_Tax",
+        "Alert_Status", "Alert_Message", "Timestamp",
+        "Extra_Floors", "Underpaid", "Ward"
+    ]].astype(object).itertuples(index=False, name=None)
+    db.save_buildings(conn, rows)
+
+
+# ============================================================
+# 5️⃣ FULL PIPELINE (CHUNK BY CHUNK)
+# ============================================================
+def predict_unique(images, width_cnn, width_scaler, batch_size, widths_by_tile, dedup=True):
+    # → (width per tile, tiles actually predicted). Byte-identical tiles
+    # are predicted once, also across chunks: widths_by_tile maps
+    # content hash → width and is all that is kept between chunks.
+    # Never a perceptual match: a similar roof must not inherit another
+    # parcel's width
+    if not dedup:
+        return verify.predict_widths(width_cnn, width_scaler, images, batch_size), len(images)
+
+    with metrics.span("batch_dedup"):
+        keys = [content_hash(tile) for tile in images]
+    todo = {}
+    for i, key in enumerate(keys):
+        if key not in widths_by_tile:
+            todo.setdefault(key, i)
+
+    widths = verify.predict_widths(width_cnn, width_scaler,
+                                   images[list(todo.values())], batch_size)
+    widths_by_tile.update(zip(todo, widths))
+    return np.array([widths_by_tile[key] for key in keys], dtype=np.float64), len(todo)
+
+
+def run_batch(register_path=verify.REGISTER_PATH, municipal_path=verify.MUNICIPAL_PATH,
+              db_path=DB_PATH, ids=None, coords=None, batch_size=256,
+              workers=os.cpu_count(), tolerance_m=COORD_TOLERANCE_M,
+              backend=None, width_cnn=None, width_scaler=None,
+              dedup=True, chunk_rows=CHUNK_ROWS):
+    # Typed, memory-mapped copy of the CSV; coordinates come pre-parsed.
+    # Chunks read only their own rows, so the register is never loaded whole
+    register = Register(register_path)
+    rows = select_rows(register, ids, coords, tolerance_m)
+    print(f"📋 Buildings selected: {len(rows)}")
+
+    if width_cnn is None:
+        width_cnn, width_scaler = verify.load_width_model(backend=backend)
+    size = input_size(width_cnn)
+    municipal = load_municipal(municipal_path)
+    conn = db.connect(db_path)
+
+    # Only decoded tiles of one chunk are in memory at a time
+    widths_by_tile = {}
+    seconds = np.zeros(4)   # images, CNN, tax + compare, DB
+    verified = flagged = predicted = 0
+    for start in range(0, len(rows), chunk_rows):
+        chunk = read_chunk(register, rows[start:start + chunk_rows])
+        t0 = time.perf_counter()
+
+        # Each image file of the chunk is decoded once, however many buildings share it
+        paths, path_of_row = np.unique(chunk["TopView_Image"].astype(str).to_numpy(),
+                                       return_inverse=True)
+        with metrics.span("batch_image_read"):
+            images, ok = load_images(paths.tolist(), workers, size)
+        for path in paths[~ok]:
+            print("⚠️ Missing / unreadable image:", path)
+        keep = ok[path_of_row]
+        chunk = chunk[keep].reset_index(drop=True)
+        tile_of_row = (np.cumsum(ok) - 1)[path_of_row[keep]]
+        t1 = time.perf_counter()
+
+        tile_widths, n_new = predict_unique(images, width_cnn, width_scaler, batch_size,
+                                            widths_by_tile, dedup)
+        del images
+        chunk["Predicted_Width"] = tile_widths[tile_of_row]
+        predicted += n_new
+        t2 = time.perf_counter()
+
+        with metrics.span("batch_tax_calc"):
+            chunk["Area"], chunk["Predicted_Floors"], chunk["Predicted_Tax"] = \
+                verify.compute_measures(chunk["Predicted_Width"], chunk["Building_Height"],
+                                        chunk["Building_Type"], chunk.get("Zone"))
+        with metrics.span("batch_municipal_lookup"):
+            chunk = attach_municipal(chunk, municipal_path, tolerance_m, municipal)
+        chunk["Alert_Status"], chunk["Alert_Message"] = verify.compare_with_municipal(
+            chunk["Predicted_Floors"], chunk["Predicted_Tax"],
+            chunk["Muni_Floors"], chunk["Muni_Tax"]
+        )
+        chunk["Extra_Floors"], chunk["Underpaid"] = verify.discrepancies(
+            chunk["Predicted_Floors"], chunk["Predicted_Tax"],
+            chunk["Muni_Floors"], chunk["Muni_Tax"]
+        )
+        chunk["Timestamp"] = db.now()
+        t3 = time.perf_counter()
+
+        with metrics.span("batch_db_write"):
+            write_results(chunk, conn)
+        t4 = time.perf_counter()
+
+        seconds += [t1 - t0, t2 - t1, t3 - t2, t4 - t3]
+        verified += len(chunk)
+        flagged += int((chunk["Alert_Status"] != "OK").sum())
+        metrics.count("buildings_verified", len(chunk))
+        if len(rows) > chunk_rows:
+            print(f"  … {min(start + chunk_rows, len(rows))}/{len(rows)} buildings")
+    conn.close()
+
+    print(f"🪞 {verified} buildings → {predicted} tiles predicted")
+    print(f"🖼 Images: {seconds[0]:.2f}s | 🧠 CNN: {seconds[1]:.2f}s | "
+          f"🧮 Tax + compare: {seconds[2]:.2f}s | 💾 DB: {seconds[3]:.2f}s")
+    print(f"✅ Verified {verified} buildings, flagged {flagged}")
+    return verified, flagged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify every building of a register in one run")
+    parser.add_argument("--register", default=verify.REGISTER_PATH)
+    parser.add_argument("--municipal", default=verify.MUNICIPAL_PATH)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--ids", nargs="*", help="Only verify these Building_IDs")
+    parser.add_argument("--coords", nargs="*", help='Only verify these "lat,lon" coordinates')
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="Buildings decoded / predicted / written per round")
+    parser.add_argument("--tolerance", type=float, default=COORD_TOLERANCE_M,
+                        help="Coordinate match tolerance in metres")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="Inference backend (default: WIDTH_BACKEND or keras)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Predict every tile, even byte-identical ones")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write stage timings / counters in Prometheus text format")
+    parser.add_argument("--profile", choices=["cprofile", "tf"],
+                        help="Profile the run (logs/profile.pstats or logs/tf_profile)")
+    args = parser.parse_args()
+
+    if args.metrics or args.profile:
+        metrics.enable(metrics_file=args.metrics, profile=args.profile)
+
+    with metrics.trace():
+        run_batch(args.register, args.municipal, args.db, args.ids, args.coords,
+                  args.batch_size, args.workers, args.tolerance, args.backend,
+                  dedup=not args.no_dedup, chunk_rows=args.chunk_rows)
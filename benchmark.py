@@ -0,0 +1,248 @@
+# ============================================================
+# ⏱ STAGE-LEVEL BENCHMARKS FOR THE VERIFICATION PIPELINE
+# ============================================================
+# Generates synthetic aerial tiles and a synthetic register locally,
+# then measures every stage of the hot path:
+#   decode_resize   → cv2.imread + resize (no cache)
+#   tile_cache_hit  → same tiles served from the image cache
+#   cnn_predict_bN  → width CNN at batch sizes 1 .. 256
+#   municipal_lookup→ nearest-building query on the coordinate index
+#   tax_calc        → vectorized area / floors / tax over the register
+#   sqlite_write    → bulk insert of the results into `buildings`
+# Each stage reports throughput, p50 / p99 latency and peak Python
+# memory (tracemalloc). Results are saved as JSON to compare commits:
+#
+#   python benchmark.py --tiles 500 --rows 100000
+#   python benchmark.py --compare bench_results/a.json bench_results/b.json
+
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import itertools
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import db
+import verify
+from image_cache import ImageCache, decode_tile
+from inference_backend import input_size
+from spatial_index import CoordinateIndex
+from tax_engine import compute_tax
+
+RESULTS_DIR = "bench_results"
+SQLITE_REPEATS = 5
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+# ============================================================
+# 1️⃣ SYNTHETIC DATA
+# ============================================================
+def make_tiles(folder, count, size=512, seed=0):
+    # Roof-like rectangles on a noisy ground texture, saved as JPEG
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        img = rng.integers(60, 120, (size, size, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(img, (7, 7), 0)
+        for _ in range(rng.integers(1, 4)):
+            x, y = rng.integers(0, size // 2, 2)
+            w, h = rng.integers(size // 8, size // 2, 2)
+            color = tuple(int(c) for c in rng.integers(120, 255, 3))
+            cv2.rectangle(img, (int(x), int(y)), (int(x + w), int(y + h)), color, -1)
+        path = os.path.join(folder, f"tile_{i:05d}.jpg")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def make_register(rows, tile_paths, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = 12.9716 + rng.uniform(-0.05, 0.05, rows)
+    lon = 77.5946 + rng.uniform(-0.05, 0.05, rows)
+    return pd.DataFrame({
+        "Building_ID": [f"B{i + 1:06d}" for i in range(rows)],
+        "Coordinates": [f"{a:.6f},{b:.6f}" for a, b in zip(lat, lon)],
+        "TopView_Image": [tile_paths[i % len(tile_paths)] for i in range(rows)],
+        "Building_Height": rng.integers(10, 40, rows),
+        "Building_Type": rng.choice(["Residential", "Corporate"], rows),
+        "Width": np.round(rng.uniform(8, 18, rows), 1),
+    }), lat, lon
+
+
+# ============================================================
+# 2️⃣ MEASUREMENT
+# ============================================================
+def measure(name, fn, items, repeats=1):
+    # fn() processes `items` items once; latency is per call.
+    # tracemalloc slows every allocation down several times, so peak
+    # memory comes from one extra call and the timed calls run untraced
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    times = np.array(times)
+    result = {
+        "items_per_call": items,
+        "calls": repeats,
+        "throughput_per_s": round(items * repeats / times.sum(), 2),
+        "p50_ms": round(float(np.percentile(times, 50)) * 1000, 4),
+        "p99_ms": round(float(np.percentile(times, 99)) * 1000, 4),
+        "peak_mem_mb": round(peak / 2**20, 2),
+    }
+    print(f"  {name:<20} {result['throughput_per_s']:>12} /s   "
+          f"p50 {result['p50_ms']:>10} ms   p99 {result['p99_ms']:>10} ms   "
+          f"peak {result['peak_mem_mb']:>8} MB")
+    return result
+
+
+def per_item(fn, items):
+    # Calls fn(item) for the next item (wrapping around); each call is one latency sample
+    samples = itertools.cycle(items)
+    return lambda: fn(next(samples))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================================
+# 3️⃣ STAGES
+# ============================================================
+def run(tiles, rows, backend=None, lookups=2000):
+    work = tempfile.mkdtemp(prefix="gis_bench_")
+    results = {}
+    try:
+        print(f"🧪 Generating {tiles} tiles and a {rows}-row register in {work}")
+        tile_paths = make_tiles(work, tiles)
+        register, lat, lon = make_register(rows, tile_paths)
+
+        print("\n📊 Stage results")
+        results["decode_resize"] = measure(
+            "decode_resize", per_item(lambda p: decode_tile(p, verify.IMG_SIZE), tile_paths),
+            1, repeats=len(tile_paths))
+
+        cache = ImageCache(verify.IMG_SIZE, cache_dir=os.path.join(work, "cache"),
+                           memory_entries=0)
+        for p in tile_paths:
+            cache.load(p)
+        results["tile_cache_hit"] = measure(
+            "tile_cache_hit", per_item(cache.load, tile_paths), 1, repeats=len(tile_paths))
+        cache.close()
+
+        if os.path.exists(verify.MODEL_PATH) and os.path.exists(verify.SCALER_PATH):
+            width_cnn, width_scaler = verify.load_width_model(backend=backend)
+            size = input_size(width_cnn)
+            tiles_u8 = np.stack([decode_tile(p, size) for p in tile_paths])
+            for bs in BATCH_SIZES:
+                batch = np.resize(tiles_u8, (bs,) + tiles_u8.shape[1:])
+                verify.predict_widths(width_cnn, width_scaler, batch, bs)   # warm-up
+                results[f"cnn_predict_b{bs}"] = measure(
+                    f"cnn_predict_b{bs}",
+                    lambda: verify.predict_widths(width_cnn, width_scaler, batch, bs),
+                    bs, repeats=max(3, 256 // bs))
+        else:
+            print(f"  ⚠️ {verify.MODEL_PATH} not found — CNN stages skipped (run train.py)")
+
+        index = CoordinateIndex(lat, lon)
+        rng = np.random.default_rng(1)
+        picks = rng.integers(0, rows, lookups)
+        queries = list(zip(lat[picks], lon[picks]))
+        results["municipal_lookup"] = measure(
+            "municipal_lookup", per_item(lambda q: index.nearest(*q), queries),
+            1, repeats=len(queries))
+        results["municipal_lookup_bulk"] = measure(
+            "municipal_lookup_bulk", lambda: index.query_many(lat, lon), rows, repeats=3)
+
+        widths = register["Width"].to_numpy()
+        results["tax_calc"] = measure(
+            "tax_calc",
+            lambda: compute_tax(widths, register["Building_Height"], register["Building_Type"]),
+            rows, repeats=5)
+
+        area, floors, tax, _ = compute_tax(widths, register["Building_Height"],
+                                           register["Building_Type"])
+        now = db.now()
+        db_rows = list(zip(
+            register["Building_ID"], lat.tolist(), lon.tolist(), register["Building_Type"],
+            register["Building_Height"].astype(float).tolist(), widths.tolist(), area.tolist(),
+            floors.tolist(), tax.tolist(), ["OK"] * rows, ["No discrepancies."] * rows,
+            [now] * rows, [0.0] * rows, [0.0] * rows, [None] * rows
+        ))
+        # Every call writes into its own fresh database (+1 for the memory pass)
+        conns = [db.connect(os.path.join(work, f"bench_{i}.db"))
+                 for i in range(SQLITE_REPEATS + 1)]
+        results["sqlite_write"] = measure(
+            "sqlite_write", per_item(lambda conn: db.save_buildings(conn, db_rows), conns),
+            rows, repeats=SQLITE_REPEATS)
+        for conn in conns:
+            conn.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    return results
+
+
+# ============================================================
+# 4️⃣ COMPARE TWO RUNS
+# ============================================================
+def compare(path_a, path_b):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+
+    print(f"📈 {a.get('commit')} → {b.get('commit')}  (throughput ratio, >1 = faster)")
+    for stage, ra in a["stages"].items():
+        rb = b["stages"].get(stage)
+        if rb is None:
+            continue
+        ratio = rb["throughput_per_s"] / ra["throughput_per_s"]
+        print(f"  {stage:<22} {ratio:>6.2f}x   p99 {ra['p99_ms']} → {rb['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the verification pipeline")
+    parser.add_argument("--tiles", type=int, default=200, help="Synthetic tiles to generate")
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic register rows")
+    parser.add_argument("--backend", default=None, help="keras / fp16 / int8")
+    parser.add_argument("--output", default=None, help="JSON output path")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        stages = run(args.tiles, args.rows, args.backend)
+        commit = git_commit()
+        report = {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "config": {"tiles": args.tiles, "rows": args.rows, "backend": args.backend,
+                       "cpu_count": os.cpu_count()},
+            "stages": stages,
+        }
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}_{commit or 'nogit'}.json")
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved: {output}")
@@ -0,0 +1,248 @@
+# ============================================================
+# 💾 SQLITE PERSISTENCE FOR VERIFICATION RESULTS
+# ============================================================
+# Shared by test.py, test2.py and the batch tools:
+#   - WAL journal + synchronous=NORMAL: a commit no longer waits for
+#     a full fsync of the database file
+#   - rows are written with executemany inside one transaction
+#   - indexes for the common supervisor queries (status, time, location)
+#   - result_cache: memoized predictions (see result_cache.py)
+#   - rollups per geohash cell / ward, updated with every buildings write
+#     (see rollups.py)
+
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import rollups
+
+DB_PATH = "gis_buildings.db"
+TEMP_DB_PATH = "gis_buildings_temp.db"
+
+BUILDING_COLUMNS = [
+    "Building_ID", "Latitude", "Longitude", "Building_Type", "Height",
+    "Predicted_Width", "Area", "Predicted_Floors", "Predicted_Tax",
+    "Alert_Status", "Alert_Message", "Timestamp",
+    "Extra_Floors", "Underpaid", "Ward",
+]
+
+TEMP_COLUMNS = [
+    "Coordinates", "Latitude", "Longitude", "Height", "Building_Type",
+    "Predicted_Width", "Area", "Predicted_Floors", "Predicted_Tax",
+    "Alert_Status", "Alert_Message", "Timestamp",
+]
+
+RESULT_CACHE_COLUMNS = [
+    "Cache_Key", "Model_Version", "Tax_Version",
+    "Predicted_Width", "Area", "Predicted_Floors", "Predicted_Tax", "Timestamp",
+]
+
+# test.py writes "Flagged", test2.py writes "FLAGGED"
+FLAGGED_STATUSES = ("Flagged", "FLAGGED")
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS buildings (
+    Building_ID TEXT PRIMARY KEY,
+    Latitude REAL,
+    Longitude REAL,
+    Building_Type TEXT,
+    Height REAL,
+    Predicted_Width REAL,
+    Area REAL,
+    Predicted_Floors INTEGER,
+    Predicted_Tax REAL,
+    Alert_Status TEXT,
+    Alert_Message TEXT,
+    Timestamp TEXT,
+    Extra_Floors REAL,
+    Underpaid REAL,
+    Ward TEXT
+);
+
+CREATE TABLE IF NOT EXISTS temp_verifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Coordinates TEXT,
+    Height REAL,
+    Building_Type TEXT,
+    Predicted_Width REAL,
+    Area REAL,
+    Predicted_Floors INTEGER,
+    Predicted_Tax REAL,
+    Alert_Status TEXT,
+    Alert_Message TEXT,
+    Timestamp TEXT
+);
+
+CREATE TABLE IF NOT EXISTS result_cache (
+    Cache_Key TEXT PRIMARY KEY,
+    Model_Version TEXT,
+    Tax_Version TEXT,
+    Predicted_Width REAL,
+    Area REAL,
+    Predicted_Floors INTEGER,
+    Predicted_Tax REAL,
+    Timestamp TEXT
+);
+'''
+
+INDEXES = '''
+CREATE INDEX IF NOT EXISTS idx_buildings_status_time ON buildings (Alert_Status, Timestamp);
+CREATE INDEX IF NOT EXISTS idx_buildings_time ON buildings (Timestamp);
+CREATE INDEX IF NOT EXISTS idx_buildings_latlon ON buildings (Latitude, Longitude);
+
+CREATE INDEX IF NOT EXISTS idx_temp_status_time ON temp_verifications (Alert_Status, Timestamp);
+CREATE INDEX IF NOT EXISTS idx_temp_time ON temp_verifications (Timestamp);
+CREATE INDEX IF NOT EXISTS idx_temp_latlon ON temp_verifications (Latitude, Longitude);
+'''
+
+
+# ============================================================
+# CONNECTION + SCHEMA
+# ============================================================
+ALERT_NUMBERS = re.compile(r"Extra Floors = (-?[\d.]+), Underpaid = ₹(-?[\d,.]+)")
+
+
+def _migrate(conn):
+    # temp_verifications only had the Coordinates text; add numeric
+    # lat / lon so it can be indexed like `buildings`
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(temp_verifications)")}
+    for col in ("Latitude", "Longitude"):
+        if col not in cols:
+            conn.execute(f"ALTER TABLE temp_verifications ADD COLUMN {col} REAL")
+
+    # buildings only had the discrepancy inside Alert_Message; add the
+    # numbers (parsed back out of old messages) and an optional ward
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(buildings)")}
+    for col, kind in (("Extra_Floors", "REAL"), ("Underpaid", "REAL"), ("Ward", "TEXT")):
+        if col not in cols:
+            conn.execute(f"ALTER TABLE buildings ADD COLUMN {col} {kind}")
+    if "Extra_Floors" not in cols:
+        updates = []
+        for building_id, message in conn.execute(
+                "SELECT Building_ID, Alert_Message FROM buildings WHERE Alert_Message LIKE 'Extra Floors%'"):
+            m = ALERT_NUMBERS.match(message)
+            if m:
+                updates.append((max(float(m.group(1)), 0.0),
+                                max(float(m.group(2).replace(",", "")), 0.0), building_id))
+        conn.executemany("UPDATE buildings SET Extra_Floors = ?, Underpaid = ? WHERE Building_ID = ?",
+                         updates)
+
+
+def connect(path=DB_PATH, check_same_thread=True):
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.executescript(rollups.SCHEMA)
+        _migrate(conn)
+        conn.executescript(INDEXES)
+
+    # First run with rollups on an existing database
+    if (conn.execute("SELECT 1 FROM buildings LIMIT 1").fetchone() and
+            not conn.execute("SELECT 1 FROM rollup_members LIMIT 1").fetchone()):
+        rollups.rebuild(conn, FLAGGED_STATUSES)
+    return conn
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ============================================================
+# BULK WRITES (one transaction per call)
+# ============================================================
+def save_buildings(conn, rows):
+    # rows: iterable of tuples in BUILDING_COLUMNS order. The geohash /
+    # ward rollups are updated in the same transaction.
+    rows = list(rows)
+    c = {name: i for i, name in enumerate(BUILDING_COLUMNS)}
+    with conn:
+        conn.executemany(f"""
+        INSERT OR REPLACE INTO buildings ({", ".join(BUILDING_COLUMNS)})
+        VALUES ({", ".join("?" * len(BUILDING_COLUMNS))})
+        """, rows)
+        rollups.apply(conn, [
+            (r[c["Building_ID"]], r[c["Latitude"]], r[c["Longitude"]],
+             r[c["Alert_Status"]] in FLAGGED_STATUSES,
+             r[c["Extra_Floors"]], r[c["Underpaid"]], r[c["Ward"]])
+            for r in rows
+        ])
+
+
+def save_temp_verifications(conn, rows):
+    # rows: iterable of tuples in TEMP_COLUMNS order
+    with conn:
+        conn.executemany(f"""
+        INSERT INTO temp_verifications ({", ".join(TEMP_COLUMNS)})
+        VALUES ({", ".join("?" * len(TEMP_COLUMNS))})
+        """, rows)
+
+
+# ============================================================
+# RESULT CACHE
+# ============================================================
+def get_cached_result(conn, key):
+    # → (Predicted_Width, Area, Predicted_Floors, Predicted_Tax) or None
+    return conn.execute("""
+    SELECT Predicted_Width, Area, Predicted_Floors, Predicted_Tax
+    FROM result_cache WHERE Cache_Key = ?
+    """, (key,)).fetchone()
+
+
+def save_cached_result(conn, row):
+    # row: tuple in RESULT_CACHE_COLUMNS order
+    with conn:
+        conn.execute(f"""
+        INSERT OR REPLACE INTO result_cache ({", ".join(RESULT_CACHE_COLUMNS)})
+        VALUES ({", ".join("?" * len(RESULT_CACHE_COLUMNS))})
+        """, row)
+
+
+def purge_result_cache(conn, model_version, tax_version):
+    # Results from any other model / tax table can never match again
+    with conn:
+        cur = conn.execute("""
+        DELETE FROM result_cache WHERE Model_Version != ? OR Tax_Version != ?
+        """, (model_version, tax_version))
+    return cur.rowcount
+
+
+# ============================================================
+# QUERIES
+# ============================================================
+def flagged_since(conn, since, table="buildings"):
+    # Timestamps are "YYYY-mm-dd HH:MM:SS", so string order = time order
+    if isinstance(since, datetime):
+        since = since.strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.execute(f"""
+    SELECT * FROM {table}
+    WHERE Alert_Status IN ({", ".join("?" * len(FLAGGED_STATUSES))})
+      AND Timestamp >= ?
+    ORDER BY Timestamp DESC
+    """, (*FLAGGED_STATUSES, since))
+    return cur.fetchall()
+
+
+def flagged_this_week(conn, table="buildings"):
+    return flagged_since(conn, datetime.now() - timedelta(days=7), table)
+
+
+def in_bounding_box(conn, lat_min, lat_max, lon_min, lon_max, table="buildings"):
+    cur = conn.execute(f"""
+    SELECT * FROM {table}
+    WHERE Latitude BETWEEN ? AND ?
+      AND Longitude BETWEEN ? AND ?
+    """, (lat_min, lat_max, lon_min, lon_max))
+    return cur.fetchall()
+
+
+if __name__ == "__main__":
+    # Quick supervisor view: python db.py
+    conn = connect(DB_PATH)
+    rows = flagged_this_week(conn)
+    print(f"🚩 Flagged buildings in the last 7 days: {len(rows)}")
+    for row in rows[:20]:
+        print(dict(zip(BUILDING_COLUMNS, row)))
+    conn.close()
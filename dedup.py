@@ -0,0 +1,180 @@
+# ============================================================
+# 🪞 PERCEPTUAL-HASH DEDUPLICATION OF TILES
+# ============================================================
+# Registers reuse the same tile under several Building_IDs (and the
+# generator in dataset.py cycles images to pad the record count).
+# Every tile gets a 64-bit difference hash (dHash), computed in
+# parallel over the image cache; tiles whose hashes differ by at most
+# `max_distance` bits are one group:
+#   - identical hash → same picture (also after re-encoding / resizing)
+#   - a few bits     → near duplicate (slight crop, compression, colour)
+# Near duplicates are found with a BK-tree over Hamming distance, so
+# grouping stays fast on large registers.
+#
+# Verification never reuses a prediction on a perceptual match (similar
+# roofs can share a dHash): it uses content_hash(), equal only for
+# byte-identical tiles.
+#
+#   python dedup.py                       # duplicate report for updated_file.csv
+#   python dedup.py --register other.csv --distance 6
+
+import os
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from preprocess import iter_tiles
+
+HASH_SIZE = 8                 # 8 × 8 = 64-bit hash
+NEAR_DUPLICATE_BITS = 4       # training: tiles this close are one sample
+
+
+# ============================================================
+# 1️⃣ HASHING
+# ============================================================
+def dhash(tile, hash_size=HASH_SIZE):
+    # Brighter-than-right-neighbour bits of a (hash_size+1) × hash_size thumbnail
+    gray = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).reshape(-1)
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def content_hash(tile):
+    # Exact identity of a decoded tile (verification reuses predictions on this only)
+    return hashlib.sha1(np.ascontiguousarray(tile).tobytes()).digest()
+
+
+def hash_tiles(tiles, workers=None):
+    # Tiles already in memory (uint8 BGR) → list of int hashes
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(dhash, tiles))
+
+
+def hash_paths(paths, size=128, workers=None):
+    # → (hashes, ok mask, unreadable paths); tiles come from the image cache
+    hashes = [0] * len(paths)
+    ok = np.zeros(len(paths), dtype=bool)
+    unreadable = []
+    for i, (path, tile) in enumerate(iter_tiles(paths, size, workers)):
+        if tile is None:
+            unreadable.append(path)
+        else:
+            hashes[i] = dhash(tile)
+            ok[i] = True
+    return hashes, ok, unreadable
+
+
+# ============================================================
+# 2️⃣ GROUPING (BK-TREE OVER HAMMING DISTANCE)
+# ============================================================
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    # Each node: [hash, payload, {distance: child}]. A query only visits
+    # children whose edge distance is within radius of the query distance
+    def __init__(self):
+        self.root = None
+
+    def add(self, h, payload):
+        if self.root is None:
+            self.root = [h, payload, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d in node[2]:
+                node = node[2][d]
+            else:
+                node[2][d] = [h, payload, {}]
+                return
+
+    def find(self, h, radius):
+        # Payload of the closest stored hash within radius, or None
+        best, best_d = None, radius + 1
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d < best_d:
+                best, best_d = node[1], d
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return best
+
+
+def group_duplicates(hashes, max_distance=NEAR_DUPLICATE_BITS):
+    # → for every hash, the index of its group's first member
+    rep = np.empty(len(hashes), dtype=np.int64)
+    exact = {}
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        if h not in exact:
+            j = tree.find(h, max_distance) if max_distance > 0 else None
+            if j is None:
+                tree.add(h, i)
+                j = i
+            exact[h] = j
+        rep[i] = exact[h]
+    return rep
+
+
+# ============================================================
+# 3️⃣ ONE ROW PER UNIQUE TILE
+# ============================================================
+def dedup_rows(paths, size=128, workers=None, max_distance=NEAR_DUPLICATE_BITS):
+    # → (rows, group, unreadable)
+    #   rows:  index of one row per unique readable tile (first occurrence)
+    #   group: for every row, its position in `rows` (-1 if unreadable)
+    # max_distance=None keeps every readable row
+    hashes, ok, unreadable = hash_paths(list(paths), size, workers)
+    readable = np.flatnonzero(ok)
+    group = np.full(len(ok), -1, dtype=np.int64)
+
+    if max_distance is None:
+        group[readable] = np.arange(len(readable))
+        return readable, group, unreadable
+
+    rep = readable[group_duplicates([hashes[i] for i in readable], max_distance)]
+    rows, group[readable] = np.unique(rep, return_inverse=True)
+    return rows, group, unreadable
+
+
+def group_mean(group, values):
+    # Mean of `values` per group (rows with group -1 are ignored)
+    keep = group >= 0
+    values = np.asarray(values, dtype=np.float64)
+    return (np.bincount(group[keep], weights=values[keep]) /
+            np.bincount(group[keep]))
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Report duplicate tiles in a register")
+    parser.add_argument("--register", default="updated_file.csv")
+    parser.add_argument("--distance", type=int, default=NEAR_DUPLICATE_BITS,
+                        help="Max differing hash bits for two tiles to count as duplicates")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.register)
+    rows, group, unreadable = dedup_rows(df["TopView_Image"].astype(str).tolist(),
+                                         workers=args.workers, max_distance=args.distance)
+    readable = int((group >= 0).sum())
+    print(f"🖼 {readable} readable tiles, {len(rows)} unique, "
+          f"{readable - len(rows)} duplicates, {len(unreadable)} unreadable")
+
+    sizes = np.bincount(group[group >= 0])
+    for g in np.argsort(-sizes)[:10]:
+        if sizes[g] < 2:
+            break
+        ids = df.loc[group == g, "Building_ID"].astype(str).tolist()
+        print(f"  {sizes[g]} × {df.at[rows[g], 'TopView_Image']}: {', '.join(ids[:8])}"
+              + (" …" if len(ids) > 8 else ""))
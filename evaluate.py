@@ -0,0 +1,115 @@
+# ============================================================
+# 📏 HELD-OUT EVALUATION OF THE WIDTH MODEL
+# ============================================================
+# Runs the saved model in batch over the validation split used by
+# train.py and reports:
+#   - width MAE / RMSE in metres
+#   - the real OK / FLAGGED confusion matrix: the alert computed from
+#     the predicted width vs the alert computed from the true width,
+#     both compared against municipal_data.csv
+#   - inference throughput on this machine
+#
+#   python evaluate.py                 # keras model
+#   python evaluate.py --backend int8  # any backend from inference_backend.py
+
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+import verify
+from batch_verify import attach_municipal, load_images
+from dedup import NEAR_DUPLICATE_BITS
+from inference_backend import BACKENDS, input_size
+from spatial_index import parse_coordinates
+
+REPORT_PATH = "model/eval_report.json"
+
+
+def alerts(widths, df, flag_label="FLAGGED"):
+    _, floors, tax = verify.compute_measures(widths, df["Building_Height"], df["Building_Type"],
+                                             df.get("Zone"))
+    status, _ = verify.compare_with_municipal(floors, tax, df["Muni_Floors"], df["Muni_Tax"],
+                                              flag_label)
+    return status == flag_label
+
+
+def evaluate(register_path, municipal_path, backend=None, batch_size=256,
+             dedup_distance=NEAR_DUPLICATE_BITS):
+    _, val = verify.validation_split(register_path, dedup_distance)
+
+    width_cnn, width_scaler = verify.load_width_model(backend=backend)
+    images, ok = load_images(val["TopView_Image"].tolist(), os.cpu_count(),
+                             input_size(width_cnn))
+    val = val[ok].reset_index(drop=True)
+    print(f"🖼 Validation tiles: {len(val)}")
+
+    verify.predict_widths(width_cnn, width_scaler, images[:1], batch_size)   # warm-up
+
+    t0 = time.perf_counter()
+    pred = verify.predict_widths(width_cnn, width_scaler, images, batch_size)
+    seconds = time.perf_counter() - t0
+
+    true = val["Width"].to_numpy(dtype=np.float64)
+    err = pred - true
+
+    # ----- OK / FLAGGED against the municipal register -----
+    val["Latitude"], val["Longitude"] = parse_coordinates(val["Coordinates"])
+    val = attach_municipal(val, municipal_path)
+    # Truth = the row's own recorded width, not the duplicate group's mean
+    flagged_true = alerts(val["Recorded_Width"].to_numpy(dtype=np.float64), val)
+    flagged_pred = alerts(pred, val)
+
+    #                predicted OK   predicted FLAGGED
+    # actual OK          tn               fp
+    # actual FLAGGED     fn               tp
+    tn = int(np.sum(~flagged_true & ~flagged_pred))
+    fp = int(np.sum(~flagged_true & flagged_pred))
+    fn = int(np.sum(flagged_true & ~flagged_pred))
+    tp = int(np.sum(flagged_true & flagged_pred))
+    total = max(tn + fp + fn + tp, 1)
+
+    return {
+        "backend": backend or "default",
+        "samples": int(len(val)),
+        "width_mae_m": round(float(np.mean(np.abs(err))), 4),
+        "width_rmse_m": round(float(np.sqrt(np.mean(err ** 2))), 4),
+        "confusion_matrix": {"labels": ["OK", "FLAGGED"], "matrix": [[tn, fp], [fn, tp]]},
+        "alert_accuracy": round((tn + tp) / total, 4),
+        "flag_precision": round(tp / (tp + fp), 4) if tp + fp else None,
+        "flag_recall": round(tp / (tp + fn), 4) if tp + fn else None,
+        "with_municipal_record": int(val["Muni_Tax"].notna().sum()),
+        "throughput_img_s": round(len(val) / seconds, 1) if seconds > 0 else None,
+        "batch_size": batch_size,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the width model on the held-out split")
+    parser.add_argument("--register", default=verify.REGISTER_PATH)
+    parser.add_argument("--municipal", default=verify.MUNICIPAL_PATH)
+    parser.add_argument("--backend", choices=BACKENDS, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--output", default=REPORT_PATH)
+    parser.add_argument("--dedup-distance", type=int, default=NEAR_DUPLICATE_BITS,
+                        help="Same value as train.py --dedup-distance (-1 = no dedup)")
+    args = parser.parse_args()
+
+    report = evaluate(args.register, args.municipal, args.backend, args.batch_size,
+                      None if args.dedup_distance < 0 else args.dedup_distance)
+
+    (tn, fp), (fn, tp) = report["confusion_matrix"]["matrix"]
+    print(f"\n📐 Width MAE:  {report['width_mae_m']} m")
+    print(f"📐 Width RMSE: {report['width_rmse_m']} m")
+    print("\n🔎 Alert confusion matrix (rows = from true width, cols = from predicted width)")
+    print(f"{'':>16}{'OK':>10}{'FLAGGED':>10}")
+    print(f"{'OK':>16}{tn:>10}{fp:>10}")
+    print(f"{'FLAGGED':>16}{fn:>10}{tp:>10}")
+    print(f"\n✅ Alert accuracy: {report['alert_accuracy'] * 100:.2f} %")
+    print(f"🚀 Throughput: {report['throughput_img_s']} images/s (batch {report['batch_size']})")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report saved: {args.output}")
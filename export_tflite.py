@@ -0,0 +1,130 @@
+# ============================================================
+# 📦 EXPORT WIDTH CNN TO TFLITE (FLOAT16 + INT8) + COMPARISON
+# ============================================================
+# Run after train.py:
+#   python export_tflite.py
+#
+# Produces:
+#   model/width_cnn_fp16.tflite   → float16 weights
+#   model/width_cnn_int8.tflite   → int8 post-training quantization,
+#                                   calibrated on training tiles from images/
+#   model/tflite_report.json      → MAE / latency / size vs the Keras model
+#                                   on the same held-out split as train.py
+
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+import verify
+from inference_backend import TFLITE_PATHS, input_size, load_backend
+from preprocess import preprocess_images
+
+CALIBRATION_SAMPLES = 200
+REPORT_PATH = "model/tflite_report.json"
+
+
+# ============================================================
+# 1️⃣ TILES FROM THE SAME SPLIT AS train.py
+# ============================================================
+def load_tiles(paths, size=verify.IMG_SIZE):
+    images, keep, _ = preprocess_images(paths, size)
+    return images.astype(np.float32) / 255.0, keep
+
+
+# ============================================================
+# 2️⃣ CONVERSION
+# ============================================================
+def export_fp16(model):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def export_int8(model, calibration_images):
+    def representative_dataset():
+        for img in calibration_images:
+            yield [img[np.newaxis].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    # int8 kernels inside, float32 in / out so callers don't change
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+                                           tf.lite.OpsSet.TFLITE_BUILTINS]
+    return converter.convert()
+
+
+# ============================================================
+# 3️⃣ ACCURACY / LATENCY COMPARISON
+# ============================================================
+def measure(backend, images, true_widths, width_scaler, repeats=50):
+    pred_scaled = backend.predict(images, verbose=0)
+    pred = width_scaler.inverse_transform(np.asarray(pred_scaled).reshape(-1, 1))[:, 0]
+    mae = float(np.mean(np.abs(pred - true_widths)))
+
+    # Single-tile latency (what the GUI pays per click)
+    one = images[:1]
+    backend.predict_on_batch(one)
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        backend.predict_on_batch(one)
+        times.append(time.perf_counter() - t0)
+
+    # Batched throughput (what batch_verify.py pays)
+    t0 = time.perf_counter()
+    backend.predict(images, verbose=0)
+    throughput = len(images) / (time.perf_counter() - t0)
+
+    return {
+        "val_mae_m": round(mae, 4),
+        "latency_p50_ms": round(float(np.percentile(times, 50)) * 1000, 3),
+        "latency_p99_ms": round(float(np.percentile(times, 99)) * 1000, 3),
+        "throughput_img_s": round(throughput, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the width CNN to TFLite and compare backends")
+    parser.add_argument("--register", default=verify.REGISTER_PATH)
+    args = parser.parse_args()
+
+    train_df, val_df = verify.validation_split(args.register)
+    paths_train = train_df["TopView_Image"].to_numpy()
+    paths_val = val_df["TopView_Image"].to_numpy()
+    widths_val = val_df["Width"].to_numpy(dtype=np.float64)
+    width_cnn, width_scaler = verify.load_width_model(backend="keras")
+
+    size = input_size(width_cnn)
+    calibration, _ = load_tiles(paths_train[:CALIBRATION_SAMPLES], size)
+    print(f"🎯 Calibrating int8 on {len(calibration)} training tiles")
+
+    with open(TFLITE_PATHS["fp16"], "wb") as f:
+        f.write(export_fp16(width_cnn))
+    with open(TFLITE_PATHS["int8"], "wb") as f:
+        f.write(export_int8(width_cnn, calibration))
+    print("✅ Saved:", ", ".join(TFLITE_PATHS.values()))
+
+    val_images, keep = load_tiles(paths_val, size)
+    widths_val = widths_val[keep]
+
+    report = {}
+    for name, path in [("keras", verify.MODEL_PATH)] + list(TFLITE_PATHS.items()):
+        backend = width_cnn if name == "keras" else load_backend(name)
+        report[name] = measure(backend, val_images, widths_val, width_scaler)
+        report[name]["size_kb"] = round(os.path.getsize(path) / 1024, 1)
+
+    print(f"\n📊 Held-out split: {len(val_images)} tiles")
+    print(f"{'backend':<8}{'MAE (m)':>10}{'p50 ms':>10}{'p99 ms':>10}{'img/s':>10}{'size KB':>10}")
+    for name, r in report.items():
+        print(f"{name:<8}{r['val_mae_m']:>10}{r['latency_p50_ms']:>10}{r['latency_p99_ms']:>10}"
+              f"{r['throughput_img_s']:>10}{r['size_kb']:>10}")
+
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\n💾 Report saved:", REPORT_PATH)
@@ -0,0 +1,67 @@
+# ============================================================
+# 🔒 OS FILE LOCKS (RELEASED WHEN THE PROCESS DIES)
+# ============================================================
+# Exclusive lock on <name>.lock through fcntl.flock (Linux / macOS) or
+# msvcrt.locking (Windows). The OS drops the lock when the holder exits
+# or crashes, so a killed process never leaves a stale lock behind.
+# The lock file itself stays on disk and is reused.
+#
+#   f = try_lock("cache/tiles_128.lock")     # non-blocking, None if taken
+#   with FileLock("municipal_data.csv"):     # waits up to LOCK_TIMEOUT_S
+#       ...
+
+import time
+
+try:
+    import fcntl
+except ImportError:       # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_TIMEOUT_S = 30.0
+
+
+def try_lock(path):
+    # Exclusive, non-blocking lock → open lock file, or None if another process has it
+    f = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def release(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    f.close()
+
+
+class FileLock:
+    # Serializes writers of `path` through <path>.lock
+    def __init__(self, path, timeout=LOCK_TIMEOUT_S):
+        self.lock_path = path + ".lock"
+        self.timeout = timeout
+        self.file = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            self.file = try_lock(self.lock_path)
+            if self.file is not None:
+                return self
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{self.lock_path} is held by another process")
+            time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        release(self.file)
+        self.file = None
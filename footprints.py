@@ -0,0 +1,274 @@
+# ============================================================
+# 🏠 AUTOMATIC BUILDING-FOOTPRINT CANDIDATES + FAST REVIEW
+# ============================================================
+# Replaces drawing every box by hand in crop.py:
+#
+#   detect → the whole orthophoto is scanned window by window
+#            (overlapping, several windows in parallel). Roofs are
+#            segmented with classical OpenCV (edges + adaptive
+#            threshold + morphology), contours are kept when their
+#            size and rectangularity look like a building, and
+#            duplicates from the window overlap are removed (NMS).
+#   review → each candidate is shown in context; the operator only
+#            presses a key to accept or reject it. Accepted boxes are
+#            saved as crops in cropped_images/ (same place as crop.py).
+#
+# Usage:
+#   python footprints.py detect img/city.tif
+#   python footprints.py review img/city.tif
+#
+# Candidates and review decisions are kept in
+# footprints/<name>_candidates.csv, so a review can stop and resume.
+
+import os
+import csv
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from tile_ortho import Orthophoto, METRES_PER_DEGREE
+
+OUTPUT_DIR = "footprints"
+CROP_FOLDER = "cropped_images"
+
+WINDOW_PX = 2048           # detection window
+OVERLAP_PX = 256           # buildings on a window edge are seen whole by a neighbour
+MIN_AREA_M2 = 30.0         # used when the orthophoto is georeferenced
+MAX_AREA_M2 = 5000.0
+MIN_AREA_PX = 400          # used otherwise
+MAX_AREA_PX = 250000
+MIN_RECTANGULARITY = 0.6   # contour area / minimum-area rectangle
+MAX_ASPECT = 5.0
+NMS_IOU = 0.3
+
+REVIEW_CONTEXT = 0.5       # context shown around a box, fraction of its size
+REVIEW_MAX_PX = 800
+SAVE_EVERY = 20            # decisions between writes of the candidates file
+
+CANDIDATE_COLUMNS = ["Candidate", "X", "Y", "W", "H", "Score", "Coordinates", "Status", "Crop"]
+
+
+def candidates_path(ortho_path, out_dir=OUTPUT_DIR):
+    base = os.path.splitext(os.path.basename(ortho_path))[0]
+    return os.path.join(out_dir, f"{base}_candidates.csv")
+
+
+# ============================================================
+# 1️⃣ DETECTION
+# ============================================================
+def detect_window(img, min_area_px, max_area_px):
+    # BGR window → [(x, y, w, h, score)] in window pixels
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = cv2.bilateralFilter(gray, 9, 50, 50)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    edges = cv2.dilate(cv2.Canny(gray, 50, 150), kernel)
+    # Roofs are usually brighter than their local surroundings
+    bright = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY, 51, -5)
+    mask = cv2.bitwise_or(bright, edges)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=2)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for c in contours:
+        area = cv2.contourArea(c)
+        if not min_area_px <= area <= max_area_px:
+            continue
+        _, (rw, rh), _ = cv2.minAreaRect(c)
+        if rw < 1 or rh < 1:
+            continue
+        rectangularity = area / (rw * rh)
+        if rectangularity < MIN_RECTANGULARITY or max(rw, rh) / min(rw, rh) > MAX_ASPECT:
+            continue
+        x, y, w, h = cv2.boundingRect(c)
+        boxes.append((x, y, w, h, float(rectangularity)))
+    return boxes
+
+
+def area_limits_px(ortho):
+    if ortho.affine is None:
+        return MIN_AREA_PX, MAX_AREA_PX
+    # Ground size of one pixel at the centre of the orthophoto
+    a, b, c, d, e, f = ortho.affine
+    pixel = np.hypot(a, d)
+    if ortho.geographic:
+        lat = d * ortho.width / 2 + e * ortho.height / 2 + f
+        pixel *= METRES_PER_DEGREE * np.cos(np.radians(lat))
+    return MIN_AREA_M2 / pixel ** 2, MAX_AREA_M2 / pixel ** 2
+
+
+def pixel_to_coordinates(ortho, col, row):
+    # "lat,lon" of a pixel, only for orthophotos georeferenced in lat / lon
+    if ortho.affine is None or not ortho.geographic:
+        return ""
+    a, b, c, d, e, f = ortho.affine
+    return f"{d * col + e * row + f:.6f},{a * col + b * row + c:.6f}"
+
+
+def detect(ortho_path, out_dir=OUTPUT_DIR, workers=os.cpu_count(), force=False):
+    path = candidates_path(ortho_path, out_dir)
+    if not force and os.path.exists(path) and any(
+            r["Status"] != "pending" for r in load_candidates(path)):
+        print(f"⚠️ {path} already has review decisions, use --force to detect again")
+        return None
+
+    ortho = Orthophoto(ortho_path, georeferenced=False)
+    min_px, max_px = area_limits_px(ortho)
+    step = WINDOW_PX - OVERLAP_PX
+    origins = [(c, r) for r in range(0, ortho.height, step) for c in range(0, ortho.width, step)]
+    print(f"🔍 {ortho_path}: {ortho.width} × {ortho.height} px, {len(origins)} windows")
+
+    boxes, scores = [], []
+
+    def collect(col, row, found):
+        for x, y, w, h, score in found:
+            # Cut by an inner window edge: the overlapping neighbour sees it whole
+            if ((x <= 0 < col) or (y <= 0 < row) or
+                    (x + w >= WINDOW_PX and col + WINDOW_PX < ortho.width) or
+                    (y + h >= WINDOW_PX and row + WINDOW_PX < ortho.height)):
+                continue
+            boxes.append([col + x, row + y, w, h])
+            scores.append(score)
+
+    try:
+        # Windows are read in order on this thread and segmented in parallel
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for col, row in origins:
+                win = ortho.read(col, row, WINDOW_PX)
+                pending.append((col, row, pool.submit(detect_window, win, min_px, max_px)))
+                if len(pending) >= workers * 2:
+                    col, row, future = pending.popleft()
+                    collect(col, row, future.result())
+            for col, row, future in pending:
+                collect(col, row, future.result())
+
+        keep = cv2.dnn.NMSBoxes(boxes, scores, 0.0, NMS_IOU) if boxes else []
+        keep = sorted(np.asarray(keep).reshape(-1).tolist(), key=lambda i: (boxes[i][1], boxes[i][0]))
+
+        rows = []
+        for n, i in enumerate(keep, start=1):
+            x, y, w, h = boxes[i]
+            rows.append({"Candidate": n, "X": x, "Y": y, "W": w, "H": h,
+                         "Score": round(scores[i], 3),
+                         "Coordinates": pixel_to_coordinates(ortho, x + w / 2, y + h / 2),
+                         "Status": "pending", "Crop": ""})
+    finally:
+        ortho.close()
+
+    os.makedirs(out_dir, exist_ok=True)
+    save_candidates(path, rows)
+    print(f"🏠 {len(rows)} footprint candidates saved: {path}")
+    return rows
+
+
+# ============================================================
+# 2️⃣ CANDIDATES FILE
+# ============================================================
+def load_candidates(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for key in ("Candidate", "X", "Y", "W", "H"):
+            row[key] = int(row[key])
+    return rows
+
+
+def save_candidates(path, rows):
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CANDIDATE_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+# ============================================================
+# 3️⃣ REVIEW (ONE KEY PER CANDIDATE)
+# ============================================================
+def review_view(ortho, row, index, total):
+    x, y, w, h = row["X"], row["Y"], row["W"], row["H"]
+    pad_x, pad_y = int(w * REVIEW_CONTEXT), int(h * REVIEW_CONTEXT)
+    view = ortho.read(x - pad_x, y - pad_y, w + 2 * pad_x, h + 2 * pad_y)
+    cv2.rectangle(view, (pad_x, pad_y), (pad_x + w, pad_y + h), (0, 255, 0), 2)
+
+    scale = min(REVIEW_MAX_PX / max(view.shape[:2]), 4.0)
+    view = cv2.resize(view, None, fx=scale, fy=scale)
+    cv2.putText(view, f"{index + 1}/{total}  [A]ccept  [R]eject  [B]ack  [Q]uit",
+                (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+    return view
+
+
+def review(ortho_path, out_dir=OUTPUT_DIR, crop_folder=CROP_FOLDER):
+    path = candidates_path(ortho_path, out_dir)
+    if not os.path.exists(path):
+        print(f"⚠️ No candidates for {ortho_path}, run: python footprints.py detect {ortho_path}")
+        return
+    rows = load_candidates(path)
+    os.makedirs(crop_folder, exist_ok=True)
+    base = os.path.splitext(os.path.basename(ortho_path))[0]
+
+    ortho = Orthophoto(ortho_path, georeferenced=False)
+    i = next((k for k, r in enumerate(rows) if r["Status"] == "pending"), len(rows))
+    decisions = 0
+    print(f"👉 {len(rows) - i} candidates left. A = accept, R = reject, B = back, Q = quit")
+    try:
+        while i < len(rows):
+            row = rows[i]
+            cv2.imshow("Review footprints", review_view(ortho, row, i, len(rows)))
+            key = chr(cv2.waitKey(0) & 0xFF).lower()
+
+            if key == "q" or key == "\x1b":
+                break
+            if key == "b":
+                i = max(i - 1, 0)
+                continue
+            if key not in ("a", "r", "\r", " "):
+                continue
+
+            if key in ("a", "\r"):
+                crop = ortho.read(row["X"], row["Y"], row["W"], row["H"])
+                crop_path = os.path.join(crop_folder, f"crop_{base}_{row['Candidate']}.jpg")
+                cv2.imwrite(crop_path, crop)
+                row["Status"], row["Crop"] = "accepted", crop_path.replace(os.sep, "/")
+            else:
+                if row["Crop"] and os.path.exists(row["Crop"]):
+                    os.remove(row["Crop"])
+                row["Status"], row["Crop"] = "rejected", ""
+
+            i += 1
+            decisions += 1
+            if decisions % SAVE_EVERY == 0:
+                save_candidates(path, rows)
+    finally:
+        save_candidates(path, rows)
+        ortho.close()
+        cv2.destroyAllWindows()
+
+    accepted = sum(r["Status"] == "accepted" for r in rows)
+    pending = sum(r["Status"] == "pending" for r in rows)
+    print(f"✅ {accepted} accepted, {pending} still pending. Crops in: {crop_folder}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose building footprints on an orthophoto "
+                                                 "and review them with one key press each")
+    parser.add_argument("mode", choices=["detect", "review"])
+    parser.add_argument("orthophotos", nargs="+")
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--crops", default=CROP_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true",
+                        help="detect: overwrite candidates that were already reviewed")
+    args = parser.parse_args()
+
+    for ortho_path in args.orthophotos:
+        if args.mode == "detect":
+            detect(ortho_path, args.out, args.workers, args.force)
+        else:
+            review(ortho_path, args.out, args.crops)
@@ -0,0 +1,234 @@
+# ============================================================
+# 🧊 PREPROCESSED IMAGE CACHE (DISK MEMMAP + IN-MEMORY LRU)
+# ============================================================
+# Resized uint8 tiles are stored once in a memory-mapped array on
+# disk, so re-running training or verification over the same images
+# skips the JPEG decode + resize entirely.
+#
+#   cache/tiles_128.npy   → (capacity, 128, 128, 3) uint8 slots
+#   cache/tiles_128.json  → key → slot, key = abs path | mtime | size
+#
+# A file that is edited or replaced gets a new key, so stale tiles
+# are never returned. When max_entries is reached the least recently
+# used slot is reused. A small LRU of tiles is also kept in RAM.
+#
+# The index is written at exit. A run that did not exit cleanly leaves
+# tiles_128.open behind and the next run starts a fresh cache, since
+# slots may have been overwritten without the index knowing.
+#
+# Only one process may own the disk cache: the owner holds an exclusive
+# lock on tiles_128.lock (released by the OS when the process dies).
+# Other processes (a second GUI, the server, a batch run) use the RAM
+# LRU only and never touch the tiles file the owner has mapped.
+
+import os
+import json
+import atexit
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import metrics
+from file_lock import release, try_lock
+
+CACHE_DIR = "cache"
+
+DISK_MAX_ENTRIES = 200000     # ~9.8 GB at 128x128x3
+MEMORY_MAX_ENTRIES = 2048     # ~100 MB at 128x128x3
+INITIAL_CAPACITY = 1024
+
+
+def decode_tile(path, size):
+    # Full decode + resize, no caching. None if missing / unreadable
+    if not os.path.exists(path):
+        return None
+
+    img = cv2.imread(path)
+    if img is None:
+        return None
+
+    return cv2.resize(img, (size, size))
+
+
+def file_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+class ImageCache:
+    def __init__(self, size=128, cache_dir=CACHE_DIR,
+                 max_entries=DISK_MAX_ENTRIES, memory_entries=MEMORY_MAX_ENTRIES):
+        self.size = size
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.dirty = False
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.tiles_path = os.path.join(cache_dir, f"tiles_{size}.npy")
+        self.index_path = os.path.join(cache_dir, f"tiles_{size}.json")
+        self.open_marker = os.path.join(cache_dir, f"tiles_{size}.open")
+
+        # slots: key → slot, least recently used first (eviction order)
+        self.slots = OrderedDict()
+        self.tiles = None
+
+        self.lock_file = try_lock(os.path.join(cache_dir, f"tiles_{size}.lock"))
+        if self.lock_file is None:
+            print(f"ℹ️ Image cache {self.tiles_path} is in use by another process, "
+                  f"caching tiles in memory only")
+            return
+
+        if os.path.exists(self.open_marker):
+            print("⚠️ Image cache was not closed cleanly, starting a new one")
+        elif os.path.exists(self.tiles_path) and os.path.exists(self.index_path):
+            try:
+                with open(self.index_path) as f:
+                    saved = json.load(f)
+                self.tiles = np.load(self.tiles_path, mmap_mode="r+")
+                if isinstance(saved["slots"], list):
+                    self.slots = OrderedDict(saved["slots"])
+                else:
+                    # Older index: key → slot plus key → last-use tick
+                    last_used = saved["last_used"]
+                    self.slots = OrderedDict(sorted(saved["slots"].items(),
+                                                    key=lambda kv: last_used.get(kv[0], 0)))
+            except (OSError, ValueError, KeyError, TypeError):
+                print("⚠️ Image cache unreadable, starting a new one")
+                self.tiles, self.slots = None, OrderedDict()
+
+        if self.tiles is None:
+            self.tiles = self._allocate(INITIAL_CAPACITY)
+
+        open(self.open_marker, "w").close()
+        atexit.register(self.close)
+
+    # ---------------- disk storage ----------------
+    def _allocate(self, capacity):
+        tiles = np.lib.format.open_memmap(
+            self.tiles_path, mode="w+", dtype=np.uint8,
+            shape=(capacity, self.size, self.size, 3)
+        )
+        self.dirty = True
+        return tiles
+
+    def _grow(self, capacity):
+        tmp_path = self.tiles_path + ".tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.uint8,
+            shape=(capacity, self.size, self.size, 3)
+        )
+        grown[:len(self.tiles)] = self.tiles
+        grown.flush()
+        del grown
+
+        # Drop the old mapping before replacing the file (Windows keeps it locked)
+        self.tiles = None
+        os.replace(tmp_path, self.tiles_path)
+        self.tiles = np.load(self.tiles_path, mmap_mode="r+")
+        self.dirty = True
+
+    def _free_slot(self):
+        # Slots are filled in order and only reused after an eviction,
+        # so the used slots are always 0 .. len(slots) - 1
+        if len(self.slots) < len(self.tiles):
+            return len(self.slots)
+
+        if len(self.tiles) < self.max_entries:
+            self._grow(min(len(self.tiles) * 2, self.max_entries))
+            return len(self.slots)
+
+        # Full: evict the least recently used tile
+        victim, slot = self.slots.popitem(last=False)
+        self.memory.pop(victim, None)
+        return slot
+
+    def flush(self):
+        with self.lock:
+            if self.tiles is None or not self.dirty:
+                return
+            self.tiles.flush()
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"slots": list(self.slots.items())}, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+    def close(self):
+        if self.lock_file is None:
+            return
+        self.flush()
+        if os.path.exists(self.open_marker):
+            os.remove(self.open_marker)
+        self.tiles = None
+        release(self.lock_file)
+        self.lock_file = None
+
+    # ---------------- lookups ----------------
+    def _touch(self, key):
+        # Mark a disk slot as most recently used (no-op for RAM-only keys)
+        if key in self.slots:
+            self.slots.move_to_end(key)
+            self.dirty = True
+
+    def _remember(self, key, tile):
+        self.memory[key] = tile
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def load(self, path):
+        # Resized uint8 tile (read-only), or None if missing / unreadable
+        if not os.path.exists(path):
+            return None
+        key = file_key(path)
+
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self._touch(key)
+                metrics.count("tile_cache", result="memory")
+                return self.memory[key]
+
+            if key in self.slots and self.tiles is not None:
+                tile = np.array(self.tiles[self.slots[key]])
+                tile.setflags(write=False)
+                self._touch(key)
+                self._remember(key, tile)
+                metrics.count("tile_cache", result="disk")
+                return tile
+
+        # Decode outside the lock so several threads can decode at once
+        metrics.count("tile_cache", result="miss")
+        with metrics.span("image_decode_resize"):
+            tile = decode_tile(path, self.size)
+        if tile is None:
+            return None
+        tile.setflags(write=False)
+
+        with self.lock:
+            if self.tiles is not None and key not in self.slots:
+                slot = self._free_slot()
+                self.tiles[slot] = tile
+                self.slots[key] = slot
+                self.dirty = True
+            self._touch(key)
+            self._remember(key, tile)
+        return tile
+
+
+# ============================================================
+# SHARED INSTANCE (one per tile size)
+# ============================================================
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(size=128):
+    with _caches_lock:
+        if size not in _caches:
+            _caches[size] = ImageCache(size)
+        return _caches[size]
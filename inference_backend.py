@@ -0,0 +1,103 @@
+# ============================================================
+# 🔌 PLUGGABLE INFERENCE BACKEND FOR THE WIDTH CNN
+# ============================================================
+#   keras → model/width_cnn_model.h5 (full TensorFlow)
+#   fp16  → model/width_cnn_fp16.tflite
+#   int8  → model/width_cnn_int8.tflite
+#
+# All backends expose predict(x, verbose=0) and predict_on_batch(x)
+# on float32 tiles in [0, 1], so they drop in where the Keras model
+# was used. Select one with the WIDTH_BACKEND environment variable
+# (default: keras) or by passing the name explicitly.
+#
+# The TFLite backends use the small `tflite_runtime` package when it
+# is installed, so kiosks don't need TensorFlow at all.
+
+import os
+import threading
+
+import numpy as np
+
+KERAS_MODEL_PATH = "model/width_cnn_model.h5"
+TFLITE_PATHS = {
+    "fp16": "model/width_cnn_fp16.tflite",
+    "int8": "model/width_cnn_int8.tflite",
+}
+BACKENDS = ["keras"] + list(TFLITE_PATHS)
+
+
+def default_backend():
+    return os.environ.get("WIDTH_BACKEND", "keras").lower()
+
+
+def _tflite_interpreter(path):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+    return Interpreter(model_path=path, num_threads=os.cpu_count())
+
+
+class TFLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self.interpreter = _tflite_interpreter(path)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+        # One interpreter is not safe to call from several threads
+        self.lock = threading.Lock()
+
+    def _run(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        with self.lock:
+            if self.batch_size != len(x):
+                self.interpreter.resize_tensor_input(self.input["index"], x.shape)
+                self.interpreter.allocate_tensors()
+                self.input = self.interpreter.get_input_details()[0]
+                self.output = self.interpreter.get_output_details()[0]
+                self.batch_size = len(x)
+
+            # Integer-only models need quantized input / dequantized output
+            scale, zero = self.input["quantization"]
+            if self.input["dtype"] != np.float32:
+                x = np.round(x / scale + zero).astype(self.input["dtype"])
+
+            self.interpreter.set_tensor(self.input["index"], x)
+            self.interpreter.invoke()
+            y = self.interpreter.get_tensor(self.output["index"])
+
+            scale, zero = self.output["quantization"]
+            if self.output["dtype"] != np.float32:
+                y = (y.astype(np.float32) - zero) * scale
+            return y.reshape(len(x), -1)
+
+    def predict_on_batch(self, x):
+        return self._run(x)
+
+    def predict(self, x, verbose=0, batch_size=256):
+        x = np.asarray(x)
+        if len(x) == 0:
+            return np.empty((0, 1), dtype=np.float32)
+        return np.concatenate([self._run(x[i:i + batch_size])
+                               for i in range(0, len(x), batch_size)])
+
+
+def input_size(model):
+    # Tile size the model was trained on (train.py --img-size)
+    if isinstance(model, TFLiteBackend):
+        return int(model.input["shape"][1])
+    return int(model.input_shape[1])
+
+
+def load_backend(name=None, keras_path=KERAS_MODEL_PATH):
+    name = (name or default_backend()).lower()
+
+    if name == "keras":
+        from tensorflow.keras.models import load_model
+        return load_model(keras_path, compile=False)
+
+    if name in TFLITE_PATHS:
+        return TFLiteBackend(TFLITE_PATHS[name])
+
+    raise ValueError(f"Unknown inference backend '{name}', choose from {BACKENDS}")
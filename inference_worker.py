@@ -0,0 +1,133 @@
+# ============================================================
+# 🧵 BACKGROUND INFERENCE WORKER FOR THE CUSTOMTKINTER APPS
+# ============================================================
+# Verification (image read, CNN predict, municipal lookup, DB write)
+# runs on a worker thread so the Tk main loop never freezes.
+#
+#   - submit(job) queues a request and returns its id
+#   - cancel(id) / cancel_all() drop queued requests and stop the
+#     running one at its next progress step
+#   - results, errors and progress are posted back to the UI thread
+#     through root.after polling (Tk must only be used from there)
+
+import queue
+import itertools
+import threading
+
+import metrics
+
+
+class VerificationError(Exception):
+    # Error meant for the operator: shown as a message box with a title
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+
+
+class Cancelled(Exception):
+    pass
+
+
+class InferenceWorker:
+    def __init__(self, root, handler, on_result, on_error, on_progress=None, poll_ms=50):
+        # handler(job, progress) runs on the worker thread and returns a result;
+        # progress(fraction, text) reports a step and raises Cancelled if needed
+        self.root = root
+        self.handler = handler
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.poll_ms = poll_ms
+
+        self.requests = queue.Queue()
+        self.events = queue.Queue()
+        self.ids = itertools.count(1)
+        self.active = set()      # ids queued or running
+        self.cancelled = set()   # subset of active, dropped when the job ends
+        self.lock = threading.Lock()
+        self.running = True
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    # ---------------- UI thread API ----------------
+    def submit(self, job):
+        with self.lock:
+            job_id = next(self.ids)
+            self.active.add(job_id)
+        self.requests.put((job_id, job))
+        return job_id
+
+    def cancel(self, job_id):
+        with self.lock:
+            if job_id in self.active:
+                self.cancelled.add(job_id)
+
+    def cancel_all(self):
+        with self.lock:
+            self.cancelled.update(self.active)
+
+    def queued(self):
+        with self.lock:
+            return len(self.active)
+
+    def stop(self):
+        self.running = False
+        self.cancel_all()
+        self.requests.put(None)
+
+    # ---------------- worker thread ----------------
+    def _is_cancelled(self, job_id):
+        with self.lock:
+            return job_id in self.cancelled
+
+    def _run(self):
+        while self.running:
+            item = self.requests.get()
+            if item is None:
+                break
+            job_id, job = item
+
+            def progress(fraction, text):
+                if self._is_cancelled(job_id):
+                    raise Cancelled()
+                self.events.put(("progress", job_id, (fraction, text)))
+
+            try:
+                progress(0.0, "Queued request started")
+                with metrics.trace(), metrics.span("verification"):
+                    result = self.handler(job, progress)
+                self.events.put(("result", job_id, result))
+                metrics.count("verifications", result="ok")
+            except Cancelled:
+                self.events.put(("cancelled", job_id, None))
+                metrics.count("verifications", result="cancelled")
+            except Exception as e:
+                self.events.put(("error", job_id, e))
+                metrics.count("verifications", result="error")
+            finally:
+                with self.lock:
+                    self.active.discard(job_id)
+                    self.cancelled.discard(job_id)
+
+    # ---------------- back on the UI thread ----------------
+    def _poll(self):
+        while True:
+            try:
+                kind, job_id, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "result":
+                self.on_result(job_id, payload)
+            elif kind == "error":
+                self.on_error(job_id, payload)
+            elif kind == "progress" and self.on_progress:
+                self.on_progress(job_id, *payload)
+            elif kind == "cancelled" and self.on_progress:
+                self.on_progress(job_id, 0.0, "Cancelled")
+
+        if self.running:
+            self.root.after(self.poll_ms, self._poll)
@@ -0,0 +1,106 @@
+# ============================================================
+# 📥 APPEND-ONLY INGESTION INTO municipal_data.csv
+# ============================================================
+# New buildings are appended to the end of the CSV instead of
+# loading + rewriting the whole file:
+#   - an OS lock on <csv>.lock (file_lock.py) serializes operators
+#     appending at the same time; it is released if width.py crashes
+#   - Building_IDs come from a counter file updated under the lock,
+#     so two operators can never get the same ID
+#   - only the header and the last line of the CSV are read
+
+import os
+import csv
+import io
+
+from file_lock import FileLock
+
+
+# ============================================================
+# READ ONLY WHAT IS NEEDED
+# ============================================================
+def read_header(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def read_last_row(csv_path, chunk=8192):
+    # Last data row as a dict, reading only the end of the file
+    header = read_header(csv_path)
+    with open(csv_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - chunk))
+        tail = f.read().decode("utf-8", errors="replace")
+
+    lines = [line for line in tail.splitlines() if line.strip()]
+    if not lines:
+        return None
+    row = next(csv.reader(io.StringIO(lines[-1])))
+    if row == header:
+        return None
+    return dict(zip(header, row))
+
+
+# ============================================================
+# ATOMIC BUILDING_ID ALLOCATION
+# ============================================================
+def _id_number(building_id):
+    digits = "".join(ch for ch in str(building_id) if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+def _counter_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".next_id"
+
+
+def allocate_ids(csv_path, count):
+    # Must be called while holding FileLock(csv_path)
+    counter = _counter_path(csv_path)
+    if os.path.exists(counter):
+        with open(counter) as f:
+            next_id = int(f.read().strip())
+    else:
+        # First run: one scan of the existing IDs to seed the counter
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            next_id = max((_id_number(r["Building_ID"]) for r in csv.DictReader(f)), default=0) + 1
+
+    tmp = counter + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(next_id + count))
+    os.replace(tmp, counter)
+
+    return [f"B{str(n).zfill(3)}" for n in range(next_id, next_id + count)]
+
+
+# ============================================================
+# APPEND
+# ============================================================
+def append_buildings(csv_path, count, make_row):
+    # make_row(i, building_id) → dict for the i-th new building. Runs
+    # under the lock, so the IDs it receives are final. Returns the rows.
+    with FileLock(csv_path):
+        header = read_header(csv_path)
+        ids = allocate_ids(csv_path, count)
+        rows = [make_row(i, building_id) for i, building_id in enumerate(ids)]
+
+        dropped = set().union(*(row.keys() for row in rows)) - set(header) if rows else set()
+        if dropped:
+            print(f"⚠️ {csv_path} has no column for: {', '.join(sorted(dropped))} (not saved)")
+
+        with open(csv_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            needs_newline = False
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+
+        with open(csv_path, "a", newline="", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\n")
+            writer = csv.DictWriter(f, fieldnames=header, extrasaction="ignore", lineterminator="\n")
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    return rows
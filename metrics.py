@@ -0,0 +1,273 @@
+# ============================================================
+# 📈 HOT-PATH INSTRUMENTATION (SPANS, COUNTERS, PROFILER, PROMETHEUS)
+# ============================================================
+# Timing spans and counters around every stage of a verification:
+#
+#   with metrics.span("cnn_predict"):
+#       ...
+#   metrics.count("result_cache", result="hit")
+#
+# Disabled by default: span() then returns one shared no-op object and
+# count() returns immediately, so the instrumented code pays a single
+# global check. Switch on with environment variables (all apps) or
+# the --metrics / --profile flags of the command-line tools:
+#
+#   GIS_METRICS=1                    → collect spans / counters
+#   GIS_METRICS_FILE=logs/metrics.prom
+#                                    → Prometheus text dump, every
+#                                      GIS_METRICS_INTERVAL s and at exit
+#   GIS_METRICS_PORT=9108            → GET http://127.0.0.1:9108/metrics
+#   GIS_PROFILE=cprofile             → cProfile of every traced call,
+#                                      saved to logs/profile.pstats at exit
+#   GIS_PROFILE=tf                   → TensorFlow profiler trace in logs/tf_profile
+#                                      (open with TensorBoard)
+
+import os
+import time
+import atexit
+import cProfile
+import pstats
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "gis"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_INTERVAL_S = 15.0
+PROFILE_OUT = "logs/profile.pstats"
+TF_PROFILE_DIR = "logs/tf_profile"
+
+_enabled = False
+_lock = threading.Lock()
+_spans = {}       # stage → [bucket counts..., +Inf count, sum]
+_counters = {}    # (name, (label, value), ...) → total
+
+_profile_mode = None
+_profiles = {}    # thread id → cProfile.Profile
+_tf_started = False
+
+
+# ============================================================
+# 1️⃣ SPANS + COUNTERS
+# ============================================================
+class _NoOp:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoOp()
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+def span(name):
+    # Times the with-block into the `<prefix>_stage_seconds{stage=name}` histogram
+    if not _enabled:
+        return _NOOP
+    return _Span(name)
+
+
+def observe(name, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        h = _spans.get(name)
+        if h is None:
+            h = _spans[name] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-1] += seconds
+
+
+def count(name, n=1, **labels):
+    # Adds n to the `<prefix>_<name>_total{labels}` counter
+    if not _enabled:
+        return
+    key = (name,) + tuple(sorted(labels.items()))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+# ============================================================
+# 2️⃣ PROMETHEUS TEXT FORMAT
+# ============================================================
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render():
+    with _lock:
+        spans = {k: list(v) for k, v in _spans.items()}
+        counters = dict(_counters)
+
+    lines = []
+    if spans:
+        metric = f"{PREFIX}_stage_seconds"
+        lines += [f"# HELP {metric} Time spent in each verification stage.",
+                  f"# TYPE {metric} histogram"]
+        for stage in sorted(spans):
+            h = spans[stage]
+            cumulative = 0
+            for le, n in zip(BUCKETS, h):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            cumulative += h[len(BUCKETS)]
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {h[-1]:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {cumulative}')
+
+    for name in sorted({key[0] for key in counters}):
+        metric = f"{PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for key in sorted(k for k in counters if k[0] == name):
+            lines.append(f"{metric}{_labels(key[1:])} {counters[key]}")
+
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def _dump_every(path, interval):
+    while True:
+        time.sleep(interval)
+        dump(path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    # /metrics endpoint on a daemon thread
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
+
+
+# ============================================================
+# 3️⃣ PROFILER TRACE MODE
+# ============================================================
+class _CProfileTrace:
+    # One profile per thread (cProfile only sees the thread it runs in),
+    # merged when the process exits
+    def __enter__(self):
+        ident = threading.get_ident()
+        with _lock:
+            self.profile = _profiles.setdefault(ident, cProfile.Profile())
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        return False
+
+
+def trace():
+    # Wrap one unit of work (a verification, a batch run) for the profiler
+    if _profile_mode == "cprofile":
+        return _CProfileTrace()
+    if _profile_mode == "tf":
+        _start_tf_profiler()
+    return _NOOP
+
+
+def _start_tf_profiler():
+    global _tf_started
+    with _lock:
+        if _tf_started:
+            return
+        _tf_started = True
+    import tensorflow as tf
+    tf.profiler.experimental.start(TF_PROFILE_DIR)
+    print(f"🔬 TensorFlow profiler tracing to {TF_PROFILE_DIR}")
+
+
+def _save_profile():
+    if _profile_mode == "cprofile" and _profiles:
+        profiles = list(_profiles.values())
+        stats = pstats.Stats(profiles[0])
+        for p in profiles[1:]:
+            stats.add(p)
+        os.makedirs(os.path.dirname(PROFILE_OUT), exist_ok=True)
+        stats.dump_stats(PROFILE_OUT)
+        print(f"🔬 cProfile saved: {PROFILE_OUT} (python -m pstats {PROFILE_OUT})")
+    elif _profile_mode == "tf" and _tf_started:
+        import tensorflow as tf
+        tf.profiler.experimental.stop()
+
+
+# ============================================================
+# 4️⃣ CONFIGURATION
+# ============================================================
+def enable(metrics_file=None, port=None, profile=None, interval=METRICS_INTERVAL_S):
+    global _enabled, _profile_mode
+    _enabled = True
+
+    if metrics_file:
+        threading.Thread(target=_dump_every, args=(metrics_file, interval), daemon=True).start()
+        atexit.register(dump, metrics_file)
+    if port:
+        serve(port)
+
+    if profile:
+        if profile not in ("cprofile", "tf"):
+            raise ValueError(f"Unknown profiler '{profile}', choose cprofile or tf")
+        _profile_mode = profile
+        atexit.register(_save_profile)
+
+
+def enabled():
+    return _enabled
+
+
+def configure_from_env():
+    if os.environ.get("GIS_METRICS", "0") != "1" and not os.environ.get("GIS_PROFILE"):
+        return
+    enable(os.environ.get("GIS_METRICS_FILE"),
+           int(os.environ["GIS_METRICS_PORT"]) if os.environ.get("GIS_METRICS_PORT") else None,
+           os.environ.get("GIS_PROFILE") or None,
+           float(os.environ.get("GIS_METRICS_INTERVAL", METRICS_INTERVAL_S)))
+
+
+configure_from_env()
@@ -0,0 +1,74 @@
+# ============================================================
+# ⏳ BACKGROUND MODEL LOADING (FAST GUI STARTUP)
+# ============================================================
+# TensorFlow import + load_model + the first predict (graph tracing)
+# take several seconds. The GUIs start this loader, show the window
+# right away and enable the Predict button once `ready` is set.
+
+import os
+import csv
+import time
+import threading
+from datetime import datetime
+
+import numpy as np
+
+import verify
+from inference_backend import input_size
+
+STARTUP_LOG = "logs/startup_times.csv"
+
+
+class BackgroundModel:
+    def __init__(self, model_path=verify.MODEL_PATH, scaler_path=verify.SCALER_PATH, backend=None):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.backend = backend
+        self.width_cnn = None
+        self.width_scaler = None
+        self.error = None
+        self.ready = threading.Event()
+        self.load_seconds = None
+
+    def start(self):
+        threading.Thread(target=self._load, daemon=True).start()
+        return self
+
+    def _load(self):
+        t0 = time.perf_counter()
+        try:
+            width_cnn, width_scaler = verify.load_width_model(self.model_path, self.scaler_path,
+                                                             self.backend)
+
+            # Warm-up: the first predict traces the graph, do it now
+            # instead of on the operator's first click
+            size = input_size(width_cnn)
+            dummy = np.zeros((1, size, size, 3), dtype=np.float32)
+            width_cnn.predict(dummy, verbose=0)
+
+            self.width_cnn, self.width_scaler = width_cnn, width_scaler
+        except Exception as e:
+            self.error = e
+        self.load_seconds = time.perf_counter() - t0
+        self.ready.set()
+
+    def get(self):
+        # Blocks until loading has finished; raises if it failed
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self.width_cnn, self.width_scaler
+
+
+def log_startup(app, window_seconds, model_seconds):
+    # One row per start so startup regressions show up over time
+    print(f"🚀 {app}: window after {window_seconds:.2f}s, model ready after {model_seconds:.2f}s")
+
+    os.makedirs(os.path.dirname(STARTUP_LOG), exist_ok=True)
+    new_file = not os.path.exists(STARTUP_LOG)
+    with open(STARTUP_LOG, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["Timestamp", "App", "Window_Seconds", "Model_Ready_Seconds"])
+        writer.writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), app,
+                         f"{window_seconds:.3f}", f"{model_seconds:.3f}"])
@@ -0,0 +1,76 @@
+# ============================================================
+# 🧵 PARALLEL IMAGE PREPROCESSING (DECODE + RESIZE ON ALL CORES)
+# ============================================================
+# cv2.imread / cv2.resize release the GIL, so a thread pool decodes
+# several tiles at once without the pickling cost of processes, and
+# every worker shares the same image cache (image_cache.py).
+#
+#   - output keeps the order of the input paths
+#   - missing / corrupt files come back as None and are reported,
+#     they never crash the run
+#   - at most workers * PREFETCH_PER_WORKER tiles are in flight, so
+#     iter_tiles() can stream registers larger than RAM
+#
+# Used by train.py (via dedup.py) and batch_verify.py.
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from image_cache import decode_tile, get_cache
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+PREFETCH_PER_WORKER = 4
+
+
+def _loader(size, use_cache):
+    load = get_cache(size).load if use_cache else (lambda p: decode_tile(p, size))
+
+    def safe_load(path):
+        try:
+            return load(str(path))
+        except (cv2.error, OSError, ValueError):
+            return None
+
+    return safe_load
+
+
+def iter_tiles(paths, size=128, workers=None, use_cache=True):
+    # Yields (path, uint8 tile or None) in input order
+    load = _loader(size, use_cache)
+    workers = workers or DEFAULT_WORKERS
+    window = workers * PREFETCH_PER_WORKER
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(load, path)))
+            if len(pending) >= window:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+
+def preprocess_images(paths, size=128, workers=None, use_cache=True):
+    # → (uint8 array of the readable tiles, ok mask over paths, unreadable paths)
+    paths = list(paths)
+    images = np.empty((len(paths), size, size, 3), dtype=np.uint8)
+    ok = np.zeros(len(paths), dtype=bool)
+    failed = []
+
+    j = 0
+    for i, (path, tile) in enumerate(iter_tiles(paths, size, workers, use_cache)):
+        if tile is None:
+            failed.append(path)
+            continue
+        images[j] = tile
+        ok[i] = True
+        j += 1
+
+    return images[:j], ok, failed
+
@@ -0,0 +1,139 @@
+# ============================================================
+# 🗂 IN-MEMORY REGISTER CACHE (municipal_data.csv / updated_file.csv)
+# ============================================================
+# The register stays memory-mapped (register_store.py); only lat / lon
+# and the coordinate index live in RAM, and a lookup decodes just the
+# matched row. Every access only does an os.stat(); the file is re-read
+# when its size / mtime change:
+#   - rows appended at the end (width.py)  → only the new bytes are parsed,
+#     kept as a small DataFrame after the memory-mapped rows
+#   - anything else changed                  → full reload, through the
+#     memory-mapped binary copy of the CSV
+
+import io
+import os
+import threading
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from register_store import Register
+from spatial_index import CoordinateIndex, COORD_TOLERANCE_M, parse_coordinates
+
+# Bytes before the old end of file that must be unchanged for an
+# append-only reload to be trusted
+FINGERPRINT_BYTES = 4096
+
+
+class RegisterCache:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.reg = None          # memory-mapped rows
+        self.appended = None     # rows appended since (None until the first append)
+        self.df = None           # full frame, only built when get() asks
+        self.by_id = None        # Building_ID → position, built on first lookup_id
+        self.index = None
+        self.lat = None
+        self.lon = None
+        self.stat = None         # stat of the file when it was fully consumed
+        self.end = 0             # bytes of the file parsed so far
+        self.fingerprint = None
+
+    # ---------------- change detection ----------------
+    def _fingerprint(self, f, end):
+        start = max(0, end - FINGERPRINT_BYTES)
+        f.seek(start)
+        return hashlib.sha1(f.read(end - start)).hexdigest()
+
+    def _refresh(self):
+        if not os.path.exists(self.path):
+            self.reg = self.appended = self.df = self.by_id = None
+            self.index = self.stat = self.lat = self.lon = None
+            self.end = 0
+            return
+
+        st = os.stat(self.path)
+        if self.stat and (st.st_size, st.st_mtime_ns) == (self.stat.st_size, self.stat.st_mtime_ns):
+            return
+
+        with open(self.path, "rb") as f:
+            appended = None
+            if self.reg is not None and st.st_size > self.end:
+                f.seek(self.end - 1)
+                ends_with_newline = f.read(1) == b"\n"
+                if ends_with_newline and self._fingerprint(f, self.end) == self.fingerprint:
+                    # Only the bytes present at stat time, up to the last
+                    # complete line; a half-written row waits for the next refresh
+                    f.seek(self.end)
+                    appended = f.read(st.st_size - self.end)
+                    appended = appended[:appended.rfind(b"\n") + 1]
+
+            if appended is not None:
+                if appended:
+                    new_rows = pd.read_csv(io.BytesIO(appended), header=None,
+                                           names=self.reg.columns)
+                    new_lat, new_lon = parse_coordinates(new_rows["Coordinates"])
+                    self.appended = pd.concat([self.appended, new_rows], ignore_index=True)
+                    self.lat = np.concatenate([self.lat, new_lat])
+                    self.lon = np.concatenate([self.lon, new_lon])
+                    print(f"🔄 {self.path}: {len(new_rows)} appended rows loaded")
+                self.end += len(appended)
+            else:
+                # Typed binary copy, coordinates already parsed. Every
+                # column is mapped now, so a later rebuild of the copy
+                # (new files) cannot mix with this meta.json
+                reg = Register(self.path)
+                for name in reg.columns:
+                    reg.array(name)
+                self.reg = reg
+                self.appended = None
+                self.lat, self.lon = np.array(reg.lat), np.array(reg.lon)
+                self.end = reg.meta["source_stat"][0]
+                print(f"📂 {self.path}: {len(reg)} rows mapped")
+
+            self.fingerprint = self._fingerprint(f, self.end)
+
+        # Stat / fingerprint describe exactly the bytes consumed; if more
+        # arrived, the next access continues from self.end
+        self.stat = st if self.end == st.st_size else None
+        self.df = self.by_id = None
+        self.index = CoordinateIndex(self.lat, self.lon)
+
+    def _record(self, pos):
+        # {column: value} of one row, mapped or appended
+        if pos < len(self.reg):
+            return self.reg.row(pos)
+        return self.appended.iloc[pos - len(self.reg)].to_dict()
+
+    # ---------------- lookups ----------------
+    def get(self):
+        # Whole register as a DataFrame; decodes every column, so it is
+        # built only here (the lookups below never need it)
+        with self.lock:
+            self._refresh()
+            if self.df is None and self.reg is not None:
+                self.df = pd.concat([self.reg.frame(), self.appended], ignore_index=True)
+            return self.df
+
+    def lookup_id(self, building_id):
+        with self.lock:
+            self._refresh()
+            if self.reg is None:
+                return None
+            if self.by_id is None:
+                ids = np.asarray(self.reg.column("Building_ID")).astype(str).tolist()
+                if self.appended is not None:
+                    ids += self.appended["Building_ID"].astype(str).tolist()
+                self.by_id = {bid: i for i, bid in enumerate(ids)}
+            pos = self.by_id.get(str(building_id))
+            return None if pos is None else self._record(pos)
+
+    def lookup_coordinates(self, lat, lon, tolerance_m=COORD_TOLERANCE_M):
+        with self.lock:
+            self._refresh()
+            if self.index is None:
+                return None
+            pos = self.index.nearest(lat, lon, tolerance_m)
+            return None if pos < 0 else self._record(pos)
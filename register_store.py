@@ -0,0 +1,169 @@
+# ============================================================
+# 🧱 TYPED BINARY REGISTER FORMAT (MEMORY-MAPPED COLUMNS)
+# ============================================================
+# The CSV stays the human-editable source. Next to it a columnar
+# binary copy is kept and memory-mapped on load:
+#
+#   updated_file.csv
+#   updated_file.reg/
+#       meta.json            → columns, dtypes, categories, CSV size / mtime
+#       Latitude.npy         → float64, parsed once from "lat,lon"
+#       Longitude.npy        → float64
+#       Building_Type.npy    → int16 codes into meta["categories"]
+#       Width.npy, ...       → float32 measures (money columns stay float64)
+#       Building_ID.npy, ... → fixed-width unicode
+#
+# The binary copy is rebuilt automatically whenever the CSV's size or
+# mtime no longer match meta.json.
+#
+# Readers should only pull what they use: frame(columns, rows) for the
+# columns / positions of a chunk, row(pos) for a single record. A full
+# frame() turns every string column back into Python objects and costs
+# about as much as read_csv.
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import parse_coordinates
+
+CATEGORY_COLUMNS = {"Building_Type", "Zone"}
+# Tax amounts keep float64 so comparisons against predicted tax are exact
+FLOAT64_COLUMNS = {"Area", "Total_Tax"}
+
+
+def store_dir(csv_path):
+    return os.path.splitext(csv_path)[0] + ".reg"
+
+
+def _csv_stat(csv_path):
+    st = os.stat(csv_path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+# ============================================================
+# 1️⃣ WRITE (CSV → COLUMNS)
+# ============================================================
+def build(csv_path):
+    # Stat before reading: if the CSV changes during the read, retry; if
+    # it keeps changing, the stored stat is already stale and the next
+    # open rebuilds instead of trusting data it never saw
+    for _ in range(3):
+        source_stat = _csv_stat(csv_path)
+        df = pd.read_csv(csv_path)
+        if _csv_stat(csv_path) == source_stat:
+            break
+    out = store_dir(csv_path)
+    os.makedirs(out, exist_ok=True)
+
+    meta = {"source_stat": source_stat, "columns": list(df.columns),
+            "dtypes": {}, "categories": {}}
+
+    arrays = {}
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORY_COLUMNS:
+            cat = s.astype("category")
+            meta["categories"][col] = [str(c) for c in cat.cat.categories]
+            arrays[col] = cat.cat.codes.to_numpy().astype(np.int16)   # -1 = missing
+            meta["dtypes"][col] = "category"
+        elif pd.api.types.is_integer_dtype(s):
+            arrays[col] = s.to_numpy(dtype=np.int64)
+            meta["dtypes"][col] = "int64"
+        elif pd.api.types.is_float_dtype(s):
+            dtype = np.float64 if col in FLOAT64_COLUMNS else np.float32
+            arrays[col] = s.to_numpy(dtype=dtype)
+            meta["dtypes"][col] = np.dtype(dtype).name
+        else:
+            arrays[col] = s.fillna("").astype(str).to_numpy(dtype=str)
+            meta["dtypes"][col] = "str"
+
+    if "Coordinates" in df.columns:
+        arrays["Latitude"], arrays["Longitude"] = parse_coordinates(df["Coordinates"])
+
+    for name, arr in arrays.items():
+        tmp = os.path.join(out, name + ".tmp.npy")
+        np.save(tmp, arr)
+        os.replace(tmp, os.path.join(out, name + ".npy"))
+
+    # meta.json last: it is what marks the copy as complete and current
+    tmp = os.path.join(out, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(out, "meta.json"))
+    print(f"🧱 Binary register written: {out} ({len(df)} rows)")
+    return meta
+
+
+# ============================================================
+# 2️⃣ READ (MEMORY-MAPPED)
+# ============================================================
+class Register:
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.dir = store_dir(csv_path)
+        meta_path = os.path.join(self.dir, "meta.json")
+
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        if meta is None or meta["source_stat"] != _csv_stat(csv_path):
+            meta = build(csv_path)
+
+        self.meta = meta
+        self.columns = meta["columns"]
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.array(self.columns[0])) if self.columns else 0
+
+    def array(self, name):
+        # Raw memory-mapped column (category columns → int16 codes)
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.dir, name + ".npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    @property
+    def lat(self):
+        return self.array("Latitude")
+
+    @property
+    def lon(self):
+        return self.array("Longitude")
+
+    def column(self, name, rows=None):
+        # Whole column, or only the given positions / slice
+        arr = self.array(name)
+        if rows is not None:
+            arr = arr[rows]
+        if self.meta["dtypes"][name] == "category":
+            return pd.Categorical.from_codes(np.asarray(arr), self.meta["categories"][name])
+        return arr
+
+    def frame(self, columns=None, rows=None):
+        # DataFrame with the CSV's columns (or a subset), same column order,
+        # for every row or only the given positions
+        columns = columns or self.columns
+        return pd.DataFrame({c: self.column(c, rows) for c in columns})
+
+    def row(self, pos):
+        # One record as {column: value}; only this row leaves the memory map
+        record = {}
+        for name in self.columns:
+            value = self.array(name)[pos]
+            kind = self.meta["dtypes"][name]
+            if kind == "category":
+                value = None if value < 0 else self.meta["categories"][name][value]
+            elif kind == "str":
+                value = str(value)
+            record[name] = value
+        return record
+
+
+def load_register(csv_path, columns=None):
+    # → (DataFrame with the CSV columns, lat float64, lon float64)
+    reg = Register(csv_path)
+    return reg.frame(columns), np.asarray(reg.lat), np.asarray(reg.lon)
@@ -0,0 +1,111 @@
+# ============================================================
+# 🧠 VERIFICATION RESULT CACHE (SQLITE, KEYED BY CONTENT + VERSION)
+# ============================================================
+# Width / area / floors / tax of a building only depend on:
+#   image bytes, height, building type, zone, model + scaler files, tax table
+# The cache key hashes all of them, so re-checking an unchanged
+# building is one SELECT instead of CNN + scaler + tax math. Results
+# live in the `result_cache` table of the app's database (db.py) and
+# survive restarts.
+#
+# Deploying a new width_cnn_model.h5 / width_scaler.pkl / .tflite or a
+# new tax_rates.csv changes the version part of the key: old results
+# stop matching at once and are deleted on the next start.
+
+import os
+import hashlib
+import threading
+
+import db
+from image_cache import file_key
+from inference_backend import KERAS_MODEL_PATH, TFLITE_PATHS, default_backend
+from tax_engine import TAX_TABLE_PATH
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    # sha1 of the file contents, re-hashed only when size / mtime change
+    key = file_key(path)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digests_lock:
+        _digests[key] = digest
+    return digest
+
+
+def backend_model_path(backend=None, keras_path=KERAS_MODEL_PATH):
+    # Model file actually loaded by inference_backend.load_backend()
+    name = (backend or default_backend()).lower()
+    return keras_path if name == "keras" else TFLITE_PATHS.get(name, keras_path)
+
+
+class ResultCache:
+    def __init__(self, conn, model_path, scaler_path, tax_table_path=TAX_TABLE_PATH, lock=None):
+        self.conn = conn
+        self.tax_table_path = tax_table_path
+        self.lock = lock or threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Version of the model that this process loads at startup
+        if os.path.exists(model_path) and os.path.exists(scaler_path):
+            self.model_version = hashlib.sha1(
+                f"{file_digest(model_path)}|{file_digest(scaler_path)}".encode()).hexdigest()
+        else:
+            self.model_version = None
+            print("⚠️ Model files not found, result cache disabled")
+            return
+
+        with self.lock:
+            purged = db.purge_result_cache(self.conn, self.model_version, self.tax_version())
+        if purged:
+            print(f"🧹 Result cache: {purged} results from an older model / tax table removed")
+
+    def tax_version(self):
+        # Checked on every lookup: compute_tax() picks up a new table without a restart
+        if os.path.exists(self.tax_table_path):
+            return file_digest(self.tax_table_path)
+        return "default"
+
+    def key(self, img_path, height, building_type, zone=None):
+        # None when caching is off or the image is missing (no result to reuse)
+        if self.model_version is None or not os.path.exists(img_path):
+            return None
+        parts = [file_digest(img_path), repr(float(height)), str(building_type).strip(),
+                 self.model_version, self.tax_version()]
+        # Zone only joins the key when there is one, so zone-less keys stay valid
+        if zone is not None and zone == zone:   # not None / NaN
+            parts.append(f"zone={str(zone).strip()}")
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+    def get(self, key):
+        # → (width, area, floors, tax) or None
+        if key is None:
+            return None
+        with self.lock:
+            row = db.get_cached_result(self.conn, key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        width, area, floors, tax = row
+        return float(width), float(area), int(floors), float(tax)
+
+    def put(self, key, width, area, floors, tax):
+        if key is None:
+            return
+        with self.lock:
+            db.save_cached_result(self.conn, (
+                key, self.model_version, self.tax_version(),
+                float(width), float(area), int(floors), float(tax), db.now()
+            ))
@@ -0,0 +1,224 @@
+# ============================================================
+# 🗺 PRECOMPUTED DISCREPANCY ROLLUPS (GEOHASH CELLS / WARDS / CITY)
+# ============================================================
+# Every verified building adds to the rollup of the areas it lies in:
+#
+#   city      → "all"
+#   geohash5  → ~4.9 km cells
+#   geohash6  → ~1.2 km cells
+#   geohash7  → ~150 m cells
+#   ward      → Ward column of the register, when it has one
+#
+# Each rollup row keeps Buildings, Flagged, Extra_Floors and Underpaid.
+# db.save_buildings() updates them in the same transaction as the
+# buildings rows: a re-verified building first removes its previous
+# contribution (kept in rollup_members), then adds the new one, so the
+# rollups never need a full-table scan. Summaries read rollup_cells only.
+#
+#   python rollups.py                     # city totals + top geohash6 cells
+#   python rollups.py --level ward --top 10
+#   python rollups.py --rebuild           # recompute from the buildings table
+
+import math
+import argparse
+from collections import defaultdict
+
+GEOHASH_PRECISIONS = (5, 6, 7)
+LEVELS = ["city"] + [f"geohash{p}" for p in GEOHASH_PRECISIONS] + ["ward"]
+SQL_CHUNK = 500   # ids per IN (...) query, below SQLite's variable limit
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rollup_members (
+    Building_ID TEXT PRIMARY KEY,
+    Geohash TEXT,
+    Ward TEXT,
+    Flagged INTEGER,
+    Extra_Floors REAL,
+    Underpaid REAL
+);
+
+CREATE TABLE IF NOT EXISTS rollup_cells (
+    Level TEXT,
+    Cell TEXT,
+    Buildings INTEGER,
+    Flagged INTEGER,
+    Extra_Floors REAL,
+    Underpaid REAL,
+    PRIMARY KEY (Level, Cell)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_underpaid ON rollup_cells (Level, Underpaid);
+CREATE INDEX IF NOT EXISTS idx_rollup_flagged ON rollup_cells (Level, Flagged);
+'''
+
+
+# ============================================================
+# 1️⃣ GEOHASH
+# ============================================================
+def geohash(lat, lon, precision=max(GEOHASH_PRECISIONS)):
+    # Standard base32 geohash; "" when the coordinates are missing
+    if lat is None or lon is None or math.isnan(lat) or math.isnan(lon):
+        return ""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, ch, even = [], 0, 0, True
+    while len(code) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        ch <<= 1
+        if value >= mid:
+            ch |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(code)
+
+
+def ward_name(ward):
+    # Register wards may be missing (None / NaN / "") or numeric
+    if ward is None or (isinstance(ward, float) and math.isnan(ward)):
+        return ""
+    return str(ward).strip()
+
+
+def cells_of(gh, ward):
+    cells = [("city", "all")]
+    if gh:
+        cells += [(f"geohash{p}", gh[:p]) for p in GEOHASH_PRECISIONS]
+    if ward:
+        cells.append(("ward", ward))
+    return cells
+
+
+# ============================================================
+# 2️⃣ INCREMENTAL UPDATE
+# ============================================================
+def apply(conn, records):
+    # records: (Building_ID, lat, lon, flagged, extra_floors, underpaid, ward)
+    # Call inside the transaction that writes the buildings rows.
+    records = list(records)
+    if not records:
+        return
+
+    ids = list({str(r[0]) for r in records})
+    previous = {}
+    for i in range(0, len(ids), SQL_CHUNK):
+        chunk = ids[i:i + SQL_CHUNK]
+        for row in conn.execute(f"""
+        SELECT Building_ID, Geohash, Ward, Flagged, Extra_Floors, Underpaid
+        FROM rollup_members WHERE Building_ID IN ({", ".join("?" * len(chunk))})
+        """, chunk):
+            previous[row[0]] = row[1:]
+
+    delta = defaultdict(lambda: [0, 0, 0.0, 0.0])
+
+    def add(member, sign):
+        gh, ward, flagged, extra, underpaid = member
+        for cell in cells_of(gh, ward):
+            d = delta[cell]
+            d[0] += sign
+            d[1] += sign * flagged
+            d[2] += sign * extra
+            d[3] += sign * underpaid
+
+    for building_id, lat, lon, flagged, extra, underpaid, ward in records:
+        building_id = str(building_id)
+        if building_id in previous:
+            add(previous[building_id], -1)
+        member = (
+            geohash(float(lat), float(lon)) if lat is not None and lon is not None else "",
+            ward_name(ward),
+            int(bool(flagged)), float(extra or 0.0), float(underpaid or 0.0),
+        )
+        add(member, +1)
+        previous[building_id] = member
+
+    conn.executemany("""
+    INSERT OR REPLACE INTO rollup_members
+    (Building_ID, Geohash, Ward, Flagged, Extra_Floors, Underpaid)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """, [(bid,) + member for bid, member in previous.items()])
+
+    conn.executemany("""
+    INSERT INTO rollup_cells (Level, Cell, Buildings, Flagged, Extra_Floors, Underpaid)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (Level, Cell) DO UPDATE SET
+        Buildings = Buildings + excluded.Buildings,
+        Flagged = Flagged + excluded.Flagged,
+        Extra_Floors = Extra_Floors + excluded.Extra_Floors,
+        Underpaid = Underpaid + excluded.Underpaid
+    """, [(level, cell, *d) for (level, cell), d in delta.items()])
+    conn.execute("DELETE FROM rollup_cells WHERE Buildings <= 0")
+
+
+def rebuild(conn, flagged_statuses):
+    # Full recomputation from the buildings table (first run / repair)
+    rows = conn.execute(f"""
+    SELECT Building_ID, Latitude, Longitude,
+           Alert_Status IN ({", ".join("?" * len(flagged_statuses))}),
+           Extra_Floors, Underpaid, Ward
+    FROM buildings
+    """, tuple(flagged_statuses)).fetchall()
+    with conn:
+        conn.execute("DELETE FROM rollup_members")
+        conn.execute("DELETE FROM rollup_cells")
+        apply(conn, rows)
+    return len(rows)
+
+
+# ============================================================
+# 3️⃣ SUMMARIES (READ ROLLUPS ONLY)
+# ============================================================
+SUMMARY_COLUMNS = ["Level", "Cell", "Buildings", "Flagged", "Extra_Floors", "Underpaid"]
+ORDER_COLUMNS = {"underpaid": "Underpaid", "flagged": "Flagged", "extra_floors": "Extra_Floors"}
+
+
+def city_summary(conn):
+    row = conn.execute("""
+    SELECT Buildings, Flagged, Extra_Floors, Underpaid
+    FROM rollup_cells WHERE Level = 'city' AND Cell = 'all'
+    """).fetchone()
+    return dict(zip(SUMMARY_COLUMNS[2:], row or (0, 0, 0.0, 0.0)))
+
+
+def hotspots(conn, level="geohash6", top=20, order_by="underpaid"):
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level '{level}', choose from {LEVELS}")
+    column = ORDER_COLUMNS[order_by]
+    return conn.execute(f"""
+    SELECT {", ".join(SUMMARY_COLUMNS)} FROM rollup_cells
+    WHERE Level = ? ORDER BY {column} DESC LIMIT ?
+    """, (level, top)).fetchall()
+
+
+if __name__ == "__main__":
+    import db
+
+    parser = argparse.ArgumentParser(description="Where is underpaid tax concentrated?")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--level", choices=LEVELS[1:], default="geohash6")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--order", choices=list(ORDER_COLUMNS), default="underpaid")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute every rollup from the buildings table")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db)
+    if args.rebuild:
+        print(f"🔁 Rollups rebuilt from {rebuild(conn, db.FLAGGED_STATUSES)} buildings")
+
+    city = city_summary(conn)
+    print(f"🏙 City: {city['Buildings']} buildings, {city['Flagged']} flagged, "
+          f"{city['Extra_Floors']:g} extra floors, ₹{city['Underpaid']:,.2f} underpaid")
+    print(f"\n📍 Top {args.top} {args.level} cells by {args.order}:")
+    for _, cell, buildings, flagged, extra, underpaid in hotspots(conn, args.level, args.top,
+                                                                   args.order):
+        print(f"  {cell:<12} {flagged:>5}/{buildings:<6} flagged   "
+              f"{extra:>6g} extra floors   ₹{underpaid:>14,.2f}")
+    conn.close()
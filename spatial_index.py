@@ -0,0 +1,71 @@
+# ============================================================
+# 📍 SPATIAL INDEX FOR COORDINATE LOOKUP
+# ============================================================
+# The "lat,lon" Coordinates column is parsed once into numbers and
+# loaded into a BallTree (haversine metric), so a lookup is a
+# nearest-neighbour query within a tolerance in metres instead of a
+# substring scan over the whole register.
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_M = 6371000.0
+
+# Max distance (metres) between the typed coordinates and the
+# register coordinates for them to count as the same building
+COORD_TOLERANCE_M = 5.0
+
+
+def parse_coordinates(coords):
+    # "12.972575,77.591082" → (12.972575, 77.591082); bad rows → NaN
+    parts = pd.Series(coords).astype(str).str.split(",", n=1, expand=True)
+    if parts.shape[1] < 2:
+        parts[1] = ""
+    lat = pd.to_numeric(parts[0].str.strip(), errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(parts[1].str.strip(), errors="coerce").to_numpy(dtype=np.float64)
+    return lat, lon
+
+
+class CoordinateIndex:
+    def __init__(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+
+        # Rows without valid coordinates are left out of the tree;
+        # `rows` maps tree positions back to DataFrame positions
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        self.rows = np.flatnonzero(valid)
+        self.tree = None
+        if len(self.rows):
+            self.tree = BallTree(np.radians(np.column_stack([lat[valid], lon[valid]])),
+                                 metric="haversine")
+
+    @classmethod
+    def from_coordinates(cls, coords):
+        return cls(*parse_coordinates(coords))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def query_many(self, lat, lon, tolerance_m=COORD_TOLERANCE_M):
+        # Returns the DataFrame position of the nearest building for
+        # every query point, or -1 if none lies within tolerance_m
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        result = np.full(len(lat), -1, dtype=np.int64)
+        if self.tree is None or len(lat) == 0:
+            return result
+
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        if not valid.any():
+            return result
+
+        dist, pos = self.tree.query(np.radians(np.column_stack([lat[valid], lon[valid]])), k=1)
+        dist_m = dist[:, 0] * EARTH_RADIUS_M
+        hits = np.where(dist_m <= tolerance_m, self.rows[pos[:, 0]], -1)
+        result[valid] = hits
+        return result
+
+    def nearest(self, lat, lon, tolerance_m=COORD_TOLERANCE_M):
+        return int(self.query_many(lat, lon, tolerance_m)[0])
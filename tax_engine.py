@@ -0,0 +1,114 @@
+# ============================================================
+# 💰 TABLE-DRIVEN TAX ENGINE (VECTORIZED)
+# ============================================================
+# One place for the area / floors / tax rules used by the municipal
+# export (vdfg.py), both GUIs, the batch tools and the HTTP service.
+#
+# Rates and floor heights come from tax_rates.csv:
+#   Building_Type,Zone,Tax_Rate,Floor_Height
+#   Residential,*,12,3.0
+#   *,*,10,3.0              ← "*" matches any type / zone
+#
+# Matching order for every building: (type, zone) → (type, *) →
+# (*, zone) → (*, *). Types and zones are case-insensitive.
+# Everything is done with column operations / joins over the whole
+# register, there is no Python code per row.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+TAX_TABLE_PATH = "tax_rates.csv"
+
+# Used when tax_rates.csv is missing (same values as the shipped file)
+DEFAULT_TABLE = pd.DataFrame({
+    "Building_Type": ["Residential", "Corporate", "*"],
+    "Zone": ["*", "*", "*"],
+    "Tax_Rate": [12.0, 25.0, 10.0],
+    "Floor_Height": [3.0, 3.0, 3.0],
+})
+
+_cache = {}
+
+
+# ============================================================
+# 1️⃣ RATE TABLE
+# ============================================================
+def _normalize(values):
+    return pd.Series(values, dtype=object).fillna("*").astype(str).str.strip().str.lower()
+
+
+def load_tax_table(path=TAX_TABLE_PATH):
+    # Re-read only when the file changes
+    key = None
+    if os.path.exists(path):
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        if _cache.get("key") == key:
+            return _cache["table"]
+        table = pd.read_csv(path)
+    else:
+        table = DEFAULT_TABLE
+
+    if "Zone" not in table.columns:
+        table = table.assign(Zone="*")
+
+    table = pd.DataFrame({
+        "type": _normalize(table["Building_Type"]).to_numpy(),
+        "zone": _normalize(table["Zone"]).to_numpy(),
+        "Tax_Rate": table["Tax_Rate"].astype(np.float64).to_numpy(),
+        "Floor_Height": table["Floor_Height"].astype(np.float64).to_numpy(),
+    }).drop_duplicates(["type", "zone"], keep="last")
+
+    if not ((table["type"] == "*") & (table["zone"] == "*")).any():
+        raise ValueError(f"{path} needs a default row with Building_Type '*' and Zone '*'")
+
+    _cache["key"], _cache["table"] = key, table
+    return table
+
+
+# ============================================================
+# 2️⃣ RATE LOOKUP (JOINS, NOT ROW LOOPS)
+# ============================================================
+def lookup_rates(building_types, zones=None, table=None):
+    # → (tax_rate, floor_height) float64 arrays, one value per building
+    if table is None:
+        table = load_tax_table()
+
+    keys = pd.DataFrame({"type": _normalize(building_types).to_numpy()})
+    keys["zone"] = "*" if zones is None else _normalize(zones).to_numpy()
+
+    rate = np.full(len(keys), np.nan)
+    floor_height = np.full(len(keys), np.nan)
+
+    for type_col, zone_col in (("type", "zone"), ("type", None), (None, "zone"), (None, None)):
+        missing = np.isnan(rate)
+        if not missing.any():
+            break
+
+        any_value = np.full(missing.sum(), "*", dtype=object)
+        probe = pd.DataFrame({
+            "type": keys["type"].to_numpy()[missing] if type_col else any_value,
+            "zone": keys["zone"].to_numpy()[missing] if zone_col else any_value,
+        })
+        found = probe.merge(table, on=["type", "zone"], how="left")
+        rate[missing] = found["Tax_Rate"].to_numpy()
+        floor_height[missing] = found["Floor_Height"].to_numpy()
+
+    return rate, floor_height
+
+
+# ============================================================
+# 3️⃣ AREA / FLOORS / TAX
+# ============================================================
+def compute_tax(widths, heights, building_types, zones=None, table=None):
+    # → area, floors (int), tax, tax_rate, all arrays of len(widths)
+    widths = np.asarray(widths, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    tax_rate, floor_height = lookup_rates(building_types, zones, table)
+
+    area = widths * heights
+    floors = np.round(heights / floor_height).astype(int)
+    tax = area * floors * tax_rate
+    return area, floors, tax, tax_rate
@@ -2,151 +2,210 @@
 # 🏗 GIS BUILDING PREDICTION SYSTEM (WIDTH MODEL ONLY)
 # ============================================================
 
+import time
+STARTUP_T0 = time.perf_counter()
+
 import os
 os.environ["TK_SILENCE_DEPRECATION"] = "1"
 
-import cv2
 import numpy as np
-import pandas as pd
-import joblib
-import sqlite3
-from datetime import datetime
 import tkinter as tk
 from tkinter import messagebox
 from PIL import Image, ImageTk
-from tensorflow.keras.models import load_model
 import customtkinter as ctk
 
+from spatial_index import COORD_TOLERANCE_M
+from register_cache import RegisterCache
+from image_cache import get_cache
+from model_loader import BackgroundModel, log_startup
+from inference_worker import InferenceWorker, VerificationError
+import db
+import metrics
+from tax_engine import compute_tax
+from result_cache import ResultCache, backend_model_path
+from inference_backend import input_size
+
 # ============================================================
 # MODEL + DATA
 # ============================================================
-width_cnn = load_model("model/width_cnn_model.h5", compile=False)
-width_scaler = joblib.load("model/width_scaler.pkl")
+# TensorFlow + model are loaded (and warmed up) on a background thread
+# so the window appears immediately; Predict is enabled once ready
+model = BackgroundModel("model/width_cnn_model.h5", "model/width_scaler.pkl").start()
 
-df = pd.read_csv("updated_file.csv")
 MUNICIPAL_DATA_PATH = "municipal_data.csv"
 
+# Parsed once, re-read only when the CSV files change on disk
+register = RegisterCache("updated_file.csv")
+municipal = RegisterCache(MUNICIPAL_DATA_PATH)
+
 # ============================================================
 # DATABASE
 # ============================================================
-conn = sqlite3.connect("gis_buildings.db")
-cursor = conn.cursor()
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS buildings (
-    Building_ID TEXT PRIMARY KEY,
-    Latitude REAL,
-    Longitude REAL,
-    Building_Type TEXT,
-    Height REAL,
-    Predicted_Width REAL,
-    Area REAL,
-    Predicted_Floors INTEGER,
-    Predicted_Tax REAL,
-    Alert_Status TEXT,
-    Alert_Message TEXT,
-    Timestamp TEXT
-)
-''')
-conn.commit()
+# WAL-mode connection; written from the inference worker thread only
+conn = db.connect(db.DB_PATH, check_same_thread=False)
+
+# Same image + height + type + model + tax table → stored result, no CNN
+results = ResultCache(conn, backend_model_path(keras_path="model/width_cnn_model.h5"),
+                      "model/width_scaler.pkl")
 
 # ============================================================
 # IMAGE PREPROCESS
 # ============================================================
-def preprocess_image(img_path):
+def preprocess_image(img_path, size):
+    # Runs on the worker thread: errors are raised, not shown here
     if not os.path.exists(img_path):
-        messagebox.showerror("Missing", f"Image not found: {img_path}")
-        return None
+        raise VerificationError("Missing", f"Image not found: {img_path}")
+
+    img = get_cache(size).load(img_path)
+    if img is None:
+        raise VerificationError("Error", "Unable to read image file!")
 
-    img = cv2.imread(img_path)
-    img = cv2.resize(img, (128, 128))
     return img / 255.0
 
 # ============================================================
-# PREDICT FUNCTION
+# VERIFICATION (WORKER THREAD)
 # ============================================================
-def predict_and_display():
-    coords = coord_entry.get().strip()
-    if not coords:
-        messagebox.showwarning("Missing Input", "Enter coordinates!")
-        return
+def verify_building(job, progress):
+    lat, lon = job["lat"], job["lon"]
 
-    try:
-        lat, lon = map(float, coords.split(","))
-    except:
-        messagebox.showerror("Format Error", "Use format: 12.9716,77.5946")
-        return
+    progress(0.1, "Looking up building...")
+    with metrics.span("register_lookup"):
+        record = register.lookup_coordinates(lat, lon, COORD_TOLERANCE_M)
 
-    record = df[df["Coordinates"].str.contains(str(lat)) &
-                df["Coordinates"].str.contains(str(lon))]
+    if record is None:
+        raise VerificationError("Error", "No building found for these coordinates.")
 
-    if record.empty:
-        messagebox.showerror("Error", "No building found for these coordinates.")
-        return
-
-    record = record.iloc[0]
     height_final = float(record["Building_Height"])
     type_final = record["Building_Type"]
+    zone_final = record.get("Zone")
 
-    img = preprocess_image(record["TopView_Image"])
-    if img is None:
-        return
-
-    pred_scaled = width_cnn.predict(np.expand_dims(img, 0))
-    pred_width = width_scaler.inverse_transform(pred_scaled)[0][0]
-
-    floor_height = 3 if type_final.lower() == "residential" else 3.5
-    tax_rate = 12.5 if type_final.lower() == "residential" else 18.0
+    with metrics.span("result_cache_lookup"):
+        cache_key = results.key(record["TopView_Image"], height_final, type_final, zone_final)
+        cached = results.get(cache_key)
 
-    pred_area = pred_width * height_final
-    pred_floors = round(height_final / floor_height)
-    pred_tax = pred_area * pred_floors * tax_rate
+    if cached is not None:
+        progress(0.5, "Using stored result...")
+        metrics.count("result_cache", result="hit")
+        pred_width, pred_area, pred_floors, pred_tax = cached
+    else:
+        metrics.count("result_cache", result="miss")
+        width_cnn, width_scaler = model.get()
+        progress(0.3, "Reading image...")
+        with metrics.span("image_read"):
+            img = preprocess_image(record["TopView_Image"], input_size(width_cnn))
+
+        progress(0.5, "Predicting width...")
+        with metrics.span("cnn_predict"):
+            pred_scaled = width_cnn.predict(np.expand_dims(img, 0), verbose=0)
+        with metrics.span("inverse_transform"):
+            pred_width = width_scaler.inverse_transform(pred_scaled)[0][0]
+
+        # Same rate / floor-height table as the municipal export (tax_rates.csv)
+        with metrics.span("tax_calc"):
+            area, floors, tax, _ = compute_tax([pred_width], [height_final], [type_final],
+                                               [zone_final])
+        pred_area, pred_floors, pred_tax = float(area[0]), int(floors[0]), float(tax[0])
+        results.put(cache_key, pred_width, pred_area, pred_floors, pred_tax)
 
     alert_status = "OK"
     alert_message = "No discrepancies."
+    extra_floors, underpaid = 0.0, 0.0
 
-    if os.path.exists(MUNICIPAL_DATA_PATH):
-        muni_df = pd.read_csv(MUNICIPAL_DATA_PATH)
-        muni = muni_df[muni_df["Coordinates"].str.contains(str(lat)) &
-                       muni_df["Coordinates"].str.contains(str(lon))]
+    progress(0.7, "Comparing with municipal record...")
+    with metrics.span("municipal_lookup"):
+        muni = municipal.lookup_coordinates(lat, lon, COORD_TOLERANCE_M)
 
-        if not muni.empty:
-            muni = muni.iloc[0]
-            floor_diff = pred_floors - muni.get("Floors", 0)
-            tax_diff = pred_tax - muni.get("Total_Tax", 0)
+    if muni is not None:
+        floor_diff = pred_floors - muni.get("Floors", 0)
+        tax_diff = pred_tax - muni.get("Total_Tax", 0)
 
-            if floor_diff > 0 or tax_diff > 0:
-                alert_status = "Flagged"
-                alert_message = f"Extra Floors = {floor_diff}, Underpaid = ₹{tax_diff:,.2f}"
+        if floor_diff > 0 or tax_diff > 0:
+            alert_status = "Flagged"
+            alert_message = f"Extra Floors = {floor_diff}, Underpaid = ₹{tax_diff:,.2f}"
+            extra_floors, underpaid = max(float(floor_diff), 0.0), max(float(tax_diff), 0.0)
 
     # Insert DB
-    cursor.execute("""
-    INSERT OR REPLACE INTO buildings
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        record["Building_ID"], lat, lon, type_final, height_final,
-        pred_width, pred_area, pred_floors, pred_tax,
-        alert_status, alert_message, datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ))
-    conn.commit()
+    progress(0.9, "Saving result...")
+    with metrics.span("db_write"):
+        db.save_buildings(conn, [(
+            record["Building_ID"], lat, lon, type_final, height_final,
+            float(pred_width), pred_area, pred_floors, pred_tax,
+            alert_status, alert_message, db.now(),
+            extra_floors, underpaid, record.get("Ward")
+        )])
+    metrics.count("alerts", status=alert_status)
+
+    return {
+        "coords": job["coords"], "type": type_final, "height": height_final,
+        "width": pred_width, "area": pred_area, "floors": pred_floors, "tax": pred_tax,
+        "status": alert_status, "message": alert_message,
+    }
 
+# ============================================================
+# PREDICT BUTTON + RESULT DISPLAY (UI THREAD)
+# ============================================================
+def predict_and_display():
+    coords = coord_entry.get().strip()
+    if not coords:
+        messagebox.showwarning("Missing Input", "Enter coordinates!")
+        return
+
+    try:
+        lat, lon = map(float, coords.split(","))
+    except:
+        messagebox.showerror("Format Error", "Use format: 12.9716,77.5946")
+        return
+
+    worker.submit({"coords": coords, "lat": lat, "lon": lon})
+    update_queue_label()
+
+
+def show_result(job_id, r):
     result_box.delete("1.0", "end")
     result_box.insert("end",
-        f"📍 Coordinates: {coords}\n"
-        f"🏗 Building Type: {type_final}\n"
-        f"📏 Height: {height_final:.2f} m\n"
-        f"📐 Width: {pred_width:.2f} m\n"
-        f"📦 Area: {pred_area:.2f} sq.m\n"
-        f"🏢 Floors: {pred_floors}\n"
-        f"💰 Tax: ₹{pred_tax:,.2f}\n"
+        f"📍 Coordinates: {r['coords']}\n"
+        f"🏗 Building Type: {r['type']}\n"
+        f"📏 Height: {r['height']:.2f} m\n"
+        f"📐 Width: {r['width']:.2f} m\n"
+        f"📦 Area: {r['area']:.2f} sq.m\n"
+        f"🏢 Floors: {r['floors']}\n"
+        f"💰 Tax: ₹{r['tax']:,.2f}\n"
     )
 
-    if alert_status == "OK":
+    if r["status"] == "OK":
         big_status_label.configure(text="STATUS: OK", text_color="green")
         big_status_message.configure(text="No discrepancies found.", text_color="green")
     else:
         big_status_label.configure(text="STATUS: FLAGGED", text_color="red")
-        big_status_message.configure(text=alert_message, text_color="red")
+        big_status_message.configure(text=r["message"], text_color="red")
+
+    progress_bar.set(1.0)
+    update_queue_label()
+
+
+def show_error(job_id, error):
+    progress_bar.set(0)
+    update_queue_label()
+    if isinstance(error, VerificationError):
+        messagebox.showerror(error.title, error.message)
+    else:
+        messagebox.showerror("Error", f"Verification failed:\n{error}")
+
+
+def show_progress(job_id, fraction, text):
+    progress_bar.set(fraction)
+    progress_label.configure(text=text)
+    update_queue_label()
+
+
+def update_queue_label():
+    pending = worker.queued()
+    queue_label.configure(text=f"Requests in queue: {pending}" if pending else "")
+
+
+def cancel_requests():
+    worker.cancel_all()
+    progress_label.configure(text="Cancelling...")
 
 
 # ============================================================
@@ -217,7 +276,8 @@ button_frame.grid(row=2, column=0, columnspan=2, pady=10)
 
 predict_btn = ctk.CTkButton(
     button_frame,
-    text="🔍 Predict & Compare",
+    text="⏳ Loading model...",
+    state="disabled",
     width=200,
     fg_color="#1E88E5",
     hover_color="#1565C0",
@@ -229,6 +289,28 @@ predict_btn.pack()
 # Fix button first-click issue
 predict_btn.bind("<Button-1>", lambda e: predict_btn.focus_set())
 
+# Progress of the running request + queued requests + cancel
+progress_bar = ctk.CTkProgressBar(button_frame, width=300)
+progress_bar.set(0)
+progress_bar.pack(pady=(10, 2))
+
+progress_label = ctk.CTkLabel(button_frame, text="", font=("Segoe UI", 12), text_color="#666")
+progress_label.pack()
+
+queue_label = ctk.CTkLabel(button_frame, text="", font=("Segoe UI", 12), text_color="#666")
+queue_label.pack()
+
+cancel_btn = ctk.CTkButton(
+    button_frame,
+    text="✖ Cancel",
+    width=100,
+    fg_color="#9E9E9E",
+    hover_color="#757575",
+    font=("Segoe UI", 12),
+    command=cancel_requests
+)
+cancel_btn.pack(pady=(2, 0))
+
 # ---------- RESULTS CARD ----------
 results_card = ctk.CTkFrame(main, fg_color="white", corner_radius=10)
 results_card.grid(row=1, column=0, padx=30, pady=10, sticky="nsew")
@@ -291,10 +373,42 @@ big_status_message = ctk.CTkLabel(
 )
 big_status_message.grid(row=1, column=1, padx=15, pady=8, sticky="w")
 
+# ============================================================
+# INFERENCE WORKER (keeps the window responsive)
+# ============================================================
+worker = InferenceWorker(root, verify_building, show_result, show_error, show_progress)
+
 # CLOSE HANDLER
 def on_close():
+    worker.stop()
+    worker.thread.join(timeout=5)
     conn.close()
     root.destroy()
 
 root.protocol("WM_DELETE_WINDOW", on_close)
+
+# ============================================================
+# STARTUP: ENABLE PREDICT ONCE THE MODEL IS READY
+# ============================================================
+window_shown_after = None
+
+def on_window_shown():
+    global window_shown_after
+    window_shown_after = time.perf_counter() - STARTUP_T0
+
+def wait_for_model():
+    if not model.ready.is_set():
+        root.after(100, wait_for_model)
+        return
+
+    if model.error is not None:
+        predict_btn.configure(text="❌ Model not loaded")
+        messagebox.showerror("Model Error", f"Could not load the width model:\n{model.error}")
+        return
+
+    predict_btn.configure(state="normal", text="🔍 Predict & Compare")
+    log_startup("test.py", window_shown_after, time.perf_counter() - STARTUP_T0)
+
+root.after(0, on_window_shown)
+root.after(100, wait_for_model)
 root.mainloop()
\ No newline at end of file
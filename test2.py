@@ -2,66 +2,134 @@
 # 🏗 GIS BUILDING VERIFICATION SYSTEM (CustomTkinter + CNN Width)
 # ============================================================
 
+import time
+STARTUP_T0 = time.perf_counter()
+
 import os
-import cv2
 import numpy as np
-import pandas as pd
-import joblib
-import sqlite3
-from datetime import datetime
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from PIL import Image
-from tensorflow.keras.models import load_model
 import customtkinter as ctk
 
+from spatial_index import COORD_TOLERANCE_M
+from register_cache import RegisterCache
+from image_cache import get_cache
+from model_loader import BackgroundModel, log_startup
+from inference_worker import InferenceWorker, VerificationError
+import db
+import metrics
+from tax_engine import compute_tax
+from result_cache import ResultCache, backend_model_path
+from inference_backend import input_size
+
 # ============================================================
 # 1️⃣ MODEL + DATA
 # ============================================================
-width_cnn = load_model("model/width_cnn_model.h5", compile=False)
-width_scaler = joblib.load("model/width_scaler.pkl")
+# TensorFlow + model are loaded (and warmed up) on a background thread
+# so the window appears immediately; Predict is enabled once ready
+model = BackgroundModel("model/width_cnn_model.h5", "model/width_scaler.pkl").start()
 
 MUNICIPAL_PATH = "municipal_data.csv"
 
+# Parsed once, re-read only when the CSV changes on disk
+municipal = RegisterCache(MUNICIPAL_PATH)
+
 # (Optional) If you want DB logging like your other app:
-conn = sqlite3.connect("gis_buildings_temp.db")
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS temp_verifications (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    Coordinates TEXT,
-    Height REAL,
-    Building_Type TEXT,
-    Predicted_Width REAL,
-    Area REAL,
-    Predicted_Floors INTEGER,
-    Predicted_Tax REAL,
-    Alert_Status TEXT,
-    Alert_Message TEXT,
-    Timestamp TEXT
-)
-""")
-conn.commit()
+# WAL-mode connection; written from the inference worker thread only
+conn = db.connect(db.TEMP_DB_PATH, check_same_thread=False)
+
+# Same image + height + type + model + tax table → stored result, no CNN
+results = ResultCache(conn, backend_model_path(keras_path="model/width_cnn_model.h5"),
+                      "model/width_scaler.pkl")
 
 # ============================================================
 # 2️⃣ IMAGE PREPROCESSING
 # ============================================================
-def preprocess_image(path):
+def preprocess_image(path, size):
+    # Runs on the worker thread: errors are raised, not shown here
     if not os.path.exists(path):
-        messagebox.showerror("Error", f"Image not found:\n{path}")
-        return None
+        raise VerificationError("Error", f"Image not found:\n{path}")
 
-    img = cv2.imread(path)
+    img = get_cache(size).load(path)
     if img is None:
-        messagebox.showerror("Error", "Unable to read image file!")
-        return None
+        raise VerificationError("Error", "Unable to read image file!")
 
-    img = cv2.resize(img, (128, 128))
     return img / 255.0
 
 
 # ============================================================
-# 3️⃣ PREDICTION + COMPARISON
+# 3️⃣ PREDICTION + COMPARISON (WORKER THREAD)
+# ============================================================
+def verify_inputs(job, progress):
+    coords, lat, lon = job["coords"], job["lat"], job["lon"]
+    height_val, btype = job["height"], job["btype"]
+
+    with metrics.span("result_cache_lookup"):
+        cache_key = results.key(job["img_path"], height_val, btype)
+        cached = results.get(cache_key)
+
+    if cached is not None:
+        progress(0.4, "Using stored result...")
+        metrics.count("result_cache", result="hit")
+        width_val, area_pred, floors_pred, tax_pred = cached
+    else:
+        metrics.count("result_cache", result="miss")
+        # ----- IMAGE WIDTH PREDICTION -----
+        width_cnn, width_scaler = model.get()
+        progress(0.2, "Reading image...")
+        with metrics.span("image_read"):
+            img = preprocess_image(job["img_path"], input_size(width_cnn))
+
+        progress(0.4, "Predicting width...")
+        with metrics.span("cnn_predict"):
+            pred_scaled = width_cnn.predict(np.expand_dims(img, 0), verbose=0)
+        with metrics.span("inverse_transform"):
+            width_val = float(width_scaler.inverse_transform(pred_scaled)[0][0])
+
+        # ----- COMPUTE LOGIC -----
+        # Same rate / floor-height table as the municipal export (tax_rates.csv).
+        # Manual input has no zone, so the (type, *) / (*, *) rates apply.
+        with metrics.span("tax_calc"):
+            area, floors, tax, _ = compute_tax([width_val], [height_val], [btype])
+        area_pred, floors_pred, tax_pred = float(area[0]), int(floors[0]), float(tax[0])
+        results.put(cache_key, width_val, area_pred, floors_pred, tax_pred)
+
+    # ----- MUNICIPAL COMPARISON -----
+    progress(0.7, "Comparing with municipal record...")
+    status = "OK"
+    msg = "No discrepancies."
+
+    with metrics.span("municipal_lookup"):
+        m = municipal.lookup_coordinates(lat, lon, COORD_TOLERANCE_M)
+
+    if m is not None:
+        floor_diff = floors_pred - m.get("Floors", 0)
+        tax_diff = tax_pred - m.get("Total_Tax", 0)
+
+        if floor_diff > 0 or tax_diff > 0:
+            status = "FLAGGED"
+            msg = f"Extra Floors = {floor_diff}, Underpaid = ₹{tax_diff:,.2f}"
+
+    # ----- OPTIONAL: SAVE TO TEMP DB -----
+    progress(0.9, "Saving result...")
+    with metrics.span("db_write"):
+        db.save_temp_verifications(conn, [(
+            coords, lat, lon, height_val, btype,
+            width_val, area_pred, floors_pred, tax_pred,
+            status, msg, db.now()
+        )])
+    metrics.count("alerts", status=status)
+
+    return {
+        "coords": coords, "btype": btype, "height": height_val, "width": width_val,
+        "area": area_pred, "floors": floors_pred, "tax": tax_pred,
+        "status": status, "msg": msg,
+    }
+
+
+# ============================================================
+# 3️⃣ PREDICT BUTTON + RESULT DISPLAY (UI THREAD)
 # ============================================================
 def predict_all():
     coords = coord_entry.get().strip()
@@ -81,75 +149,61 @@ def predict_all():
         messagebox.showerror("Format Error", "Check coordinates and height format!")
         return
 
-    # ----- IMAGE WIDTH PREDICTION -----
-    img = preprocess_image(img_path)
-    if img is None:
-        return
+    worker.submit({
+        "coords": coords, "lat": lat, "lon": lon,
+        "height": height_val, "btype": btype, "img_path": img_path,
+    })
+    update_queue_label()
 
-    pred_scaled = width_cnn.predict(np.expand_dims(img, 0))
-    width_val = float(width_scaler.inverse_transform(pred_scaled)[0][0])
 
-    # ----- COMPUTE LOGIC -----
-    floor_h = 3 if btype.lower() == "residential" else 3.5
-    tax_rate = 12.5 if btype.lower() == "residential" else 18.0
+def show_result(job_id, r):
+    # ----- COLOR INDICATION -----
+    status_color = "green" if r["status"] == "OK" else "red"
+    msg_color = "green" if r["status"] == "OK" else "red"
 
-    floors_pred = round(height_val / floor_h)
-    area_pred = width_val * height_val
-    tax_pred = area_pred * floors_pred * tax_rate
+    # ----- DISPLAY RESULTS -----
+    result_box.delete("1.0", "end")
+    result_box.insert(
+        "end",
+        f"📍 Coordinates: {r['coords']}\n"
+        f"🏗 Type: {r['btype']}\n"
+        f"📏 Height: {r['height']:.2f} m\n"
+        f"📐 Predicted Width: {r['width']:.2f} m\n"
+        f"📦 Area: {r['area']:.2f} sq.m\n"
+        f"🏢 Floors: {r['floors']}\n"
+        f"💰 Tax: ₹{r['tax']:,.2f}\n"
+    )
 
-    # ----- MUNICIPAL COMPARISON -----
-    status = "OK"
-    msg = "No discrepancies."
+    status_label.configure(text=f"STATUS: {r['status']}", text_color=status_color)
+    msg_label.configure(text=r["msg"], text_color=msg_color)
 
-    if os.path.exists(MUNICIPAL_PATH):
-        muni = pd.read_csv(MUNICIPAL_PATH)
+    progress_bar.set(1.0)
+    update_queue_label()
 
-        match = muni[
-            (muni["Coordinates"].astype(str).str.contains(str(lat))) &
-            (muni["Coordinates"].astype(str).str.contains(str(lon)))
-        ]
 
-        if not match.empty:
-            m = match.iloc[0]
-            floor_diff = floors_pred - m.get("Floors", 0)
-            tax_diff = tax_pred - m.get("Total_Tax", 0)
+def show_error(job_id, error):
+    progress_bar.set(0)
+    update_queue_label()
+    if isinstance(error, VerificationError):
+        messagebox.showerror(error.title, error.message)
+    else:
+        messagebox.showerror("Error", f"Verification failed:\n{error}")
 
-            if floor_diff > 0 or tax_diff > 0:
-                status = "FLAGGED"
-                msg = f"Extra Floors = {floor_diff}, Underpaid = ₹{tax_diff:,.2f}"
 
-    # ----- OPTIONAL: SAVE TO TEMP DB -----
-    cursor.execute("""
-    INSERT INTO temp_verifications
-    (Coordinates, Height, Building_Type, Predicted_Width, Area,
-     Predicted_Floors, Predicted_Tax, Alert_Status, Alert_Message, Timestamp)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        coords, height_val, btype,
-        width_val, area_pred, floors_pred, tax_pred,
-        status, msg, datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ))
-    conn.commit()
+def show_progress(job_id, fraction, text):
+    progress_bar.set(fraction)
+    progress_label.configure(text=text)
+    update_queue_label()
 
-    # ----- COLOR INDICATION -----
-    status_color = "green" if status == "OK" else "red"
-    msg_color = "green" if status == "OK" else "red"
 
-    # ----- DISPLAY RESULTS -----
-    result_box.delete("1.0", "end")
-    result_box.insert(
-        "end",
-        f"📍 Coordinates: {coords}\n"
-        f"🏗 Type: {btype}\n"
-        f"📏 Height: {height_val:.2f} m\n"
-        f"📐 Predicted Width: {width_val:.2f} m\n"
-        f"📦 Area: {area_pred:.2f} sq.m\n"
-        f"🏢 Floors: {floors_pred}\n"
-        f"💰 Tax: ₹{tax_pred:,.2f}\n"
-    )
+def update_queue_label():
+    pending = worker.queued()
+    queue_label.configure(text=f"Requests in queue: {pending}" if pending else "")
+
 
-    status_label.configure(text=f"STATUS: {status}", text_color=status_color)
-    msg_label.configure(text=msg, text_color=msg_color)
+def cancel_requests():
+    worker.cancel_all()
+    progress_label.configure(text="Cancelling...")
 
 
 # ============================================================
@@ -293,15 +347,38 @@ button_frame.grid(row=6, column=0, columnspan=2, pady=12)
 
 predict_btn = ctk.CTkButton(
     button_frame,
-    text="🔍 Predict & Compare",
+    text="⏳ Loading model...",
+    state="disabled",
     width=220,
     fg_color="#1E88E5",
     hover_color="#1565C0",
     font=("Segoe UI", 15, "bold"),
-    command=lambda: root.after(1, predict_all)
+    command=predict_all
 )
 predict_btn.pack()
 
+# Progress of the running request + queued requests + cancel
+progress_bar = ctk.CTkProgressBar(button_frame, width=300)
+progress_bar.set(0)
+progress_bar.pack(pady=(10, 2))
+
+progress_label = ctk.CTkLabel(button_frame, text="", font=("Segoe UI", 12), text_color="#666")
+progress_label.pack()
+
+queue_label = ctk.CTkLabel(button_frame, text="", font=("Segoe UI", 12), text_color="#666")
+queue_label.pack()
+
+cancel_btn = ctk.CTkButton(
+    button_frame,
+    text="✖ Cancel",
+    width=100,
+    fg_color="#9E9E9E",
+    hover_color="#757575",
+    font=("Segoe UI", 12),
+    command=cancel_requests
+)
+cancel_btn.pack(pady=(2, 0))
+
 # ================= RESULTS CARD =================
 results_card = ctk.CTkFrame(main, fg_color="white", corner_radius=12)
 results_card.pack(fill="both", expand=True, padx=30, pady=10)
@@ -367,12 +444,44 @@ msg_label = ctk.CTkLabel(
 )
 msg_label.pack(side="left")
 
+# ============================================================
+# INFERENCE WORKER (keeps the window responsive)
+# ============================================================
+worker = InferenceWorker(root, verify_inputs, show_result, show_error, show_progress)
+
 # ============================================================
 # CLOSE HANDLER
 # ============================================================
 def on_close():
+    worker.stop()
+    worker.thread.join(timeout=5)
     conn.close()
     root.destroy()
 
 root.protocol("WM_DELETE_WINDOW", on_close)
+
+# ============================================================
+# STARTUP: ENABLE PREDICT ONCE THE MODEL IS READY
+# ============================================================
+window_shown_after = None
+
+def on_window_shown():
+    global window_shown_after
+    window_shown_after = time.perf_counter() - STARTUP_T0
+
+def wait_for_model():
+    if not model.ready.is_set():
+        root.after(100, wait_for_model)
+        return
+
+    if model.error is not None:
+        predict_btn.configure(text="❌ Model not loaded")
+        messagebox.showerror("Model Error", f"Could not load the width model:\n{model.error}")
+        return
+
+    predict_btn.configure(state="normal", text="🔍 Predict & Compare")
+    log_startup("test2.py", window_shown_after, time.perf_counter() - STARTUP_T0)
+
+root.after(0, on_window_shown)
+root.after(100, wait_for_model)
 root.mainloop()
\ No newline at end of file
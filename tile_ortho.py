@@ -0,0 +1,254 @@
+# ============================================================
+# 🗺 AUTOMATIC TILING OF LARGE GEOTIFF ORTHOPHOTOS
+# ============================================================
+# Replaces the manual crop.py step for full-city orthophotos: every
+# building of the register gets a tile cut around its coordinates.
+#
+#   - coordinates → pixels from the GeoTIFF georeferencing (rasterio),
+#     or from a world-file sidecar (.tfw / .tifw / .wld) in WGS84
+#     lat / lon when rasterio is not installed
+#   - with rasterio the orthophoto is never loaded whole: only the
+#     window around each building is read, in raster order
+#   - tiles are written by a thread pool while the next windows are read
+#
+# Usage:
+#   python tile_ortho.py                          # every .tif in img/
+#   python tile_ortho.py img/city.tif --tile-m 40 --out images/tiles
+#
+# Writes images/tiles/<Building_ID>.jpg and tiles_index.csv
+# (Building_ID, Coordinates, TopView_Image, Orthophoto).
+
+import os
+import csv
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import verify
+from register_store import Register
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+    from rasterio.warp import transform as warp_transform
+except ImportError:
+    rasterio = None
+
+INPUT_FOLDER = "img"
+OUTPUT_DIR = "images/tiles"
+INDEX_CSV = "tiles_index.csv"
+
+TILE_METRES = 40.0          # ground size of the square tile around a building
+WORLD_FILE_EXTS = (".tfw", ".tifw", ".wld")
+METRES_PER_DEGREE = 111320.0
+WRITES_IN_FLIGHT = 4        # per worker, bounds the tiles held in memory
+
+
+# ============================================================
+# 1️⃣ GEOREFERENCING
+# ============================================================
+def read_world_file(tif_path):
+    # World file → affine (a, b, c, d, e, f) with x = a*col + b*row + c,
+    # y = d*col + e*row + f, for the top-left corner of the top-left pixel
+    base = os.path.splitext(tif_path)[0]
+    for ext in WORLD_FILE_EXTS:
+        if os.path.exists(base + ext):
+            with open(base + ext) as f:
+                a, d, b, e, c, f_ = [float(v) for v in f.read().split()[:6]]
+            # World files give the centre of the top-left pixel
+            return a, b, c - a / 2 - b / 2, d, e, f_ - d / 2 - e / 2
+    return None
+
+
+def invert_affine(affine, x, y):
+    a, b, c, d, e, f = affine
+    det = a * e - b * d
+    x = np.asarray(x, dtype=np.float64) - c
+    y = np.asarray(y, dtype=np.float64) - f
+    return (e * x - b * y) / det, (a * y - d * x) / det
+
+
+class Orthophoto:
+    # georeferenced=False also accepts plain images (affine is then None)
+    def __init__(self, path, georeferenced=True):
+        self.path = path
+        self.dataset = None
+        self.image = None
+        self.geographic = True
+
+        if rasterio is not None:
+            self.dataset = rasterio.open(path)
+            t = self.dataset.transform
+            self.affine = (t.a, t.b, t.c, t.d, t.e, t.f)
+            self.width, self.height = self.dataset.width, self.dataset.height
+            crs = self.dataset.crs
+            self.geographic = crs is None or crs.is_geographic
+            # A plain image opens with an identity transform and no CRS:
+            # not georeferenced. Without a CRS only a world file (read as
+            # lat / lon, like the non-rasterio path) is trusted.
+            if t.is_identity or (crs is None and read_world_file(path) is None):
+                self.affine = None
+                if georeferenced:
+                    self.close()
+                    raise ValueError(f"{path}: not georeferenced (no CRS / world file)")
+            return
+
+        self.affine = read_world_file(path)
+        if self.affine is None and georeferenced:
+            raise ValueError(f"{path}: no world file ({', '.join(WORLD_FILE_EXTS)}) "
+                             "and rasterio is not installed")
+        print(f"⚠️ rasterio not installed: {os.path.basename(path)} is loaded whole")
+        self.image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if self.image is None:
+            raise ValueError(f"{path}: unreadable image")
+        self.height, self.width = self.image.shape[:2]
+
+    def close(self):
+        if self.dataset is not None:
+            self.dataset.close()
+        self.image = None
+
+    def to_pixel(self, lat, lon):
+        # WGS84 lat / lon → fractional (col, row)
+        x, y = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+        if not self.geographic:
+            x, y = warp_transform("EPSG:4326", self.dataset.crs, x, y)
+        return invert_affine(self.affine, x, y)
+
+    def tile_pixels(self, lat, tile_m):
+        # Side of a tile_m × tile_m ground square, in pixels
+        a, b, _, d, _, _ = self.affine
+        pixel = np.hypot(a, d)
+        if self.geographic:
+            pixel *= METRES_PER_DEGREE * np.cos(np.radians(lat))
+        return max(int(round(tile_m / pixel)), 1)
+
+    def read(self, col, row, width, height=None):
+        # BGR uint8 window of width × height (square by default),
+        # zero-padded past the edges
+        height = height or width
+        if self.dataset is not None:
+            bands = [1, 2, 3] if self.dataset.count >= 3 else [1]
+            win = self.dataset.read(bands, window=Window(col, row, width, height),
+                                    boundless=True, fill_value=0)
+            win = np.moveaxis(win, 0, -1)
+            if win.dtype == np.uint16:
+                win = (win >> 8).astype(np.uint8)
+            elif win.dtype != np.uint8:
+                win = np.clip(win, 0, 255).astype(np.uint8)
+            if win.shape[2] == 1:
+                return cv2.cvtColor(win, cv2.COLOR_GRAY2BGR)
+            return cv2.cvtColor(win, cv2.COLOR_RGB2BGR)
+
+        tile = np.zeros((height, width, 3), dtype=np.uint8)
+        r0, c0 = max(row, 0), max(col, 0)
+        r1, c1 = min(row + height, self.height), min(col + width, self.width)
+        if r1 > r0 and c1 > c0:
+            tile[r0 - row:r1 - row, c0 - col:c1 - col] = self.image[r0:r1, c0:c1]
+        return tile
+
+
+# ============================================================
+# 2️⃣ TILING
+# ============================================================
+def find_orthophotos(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths += sorted(os.path.join(item, f) for f in os.listdir(item)
+                            if f.lower().endswith((".tif", ".tiff")))
+        else:
+            paths.append(item)
+    return paths
+
+
+def tile_orthophoto(ortho, ids, lat, lon, out_dir, tile_m, pool, workers):
+    # Tiles for the buildings inside this orthophoto → [(index, path)]
+    cols, rows = ortho.to_pixel(lat, lon)
+    inside = np.flatnonzero((cols >= 0) & (cols < ortho.width) &
+                            (rows >= 0) & (rows < ortho.height))
+    # Raster order: windows are read top to bottom through the file
+    inside = inside[np.argsort(rows[inside], kind="stable")]
+
+    written = []
+    pending = deque()
+    for i in inside:
+        size = ortho.tile_pixels(lat[i], tile_m)
+        tile = ortho.read(int(cols[i]) - size // 2, int(rows[i]) - size // 2, size)
+        path = os.path.join(out_dir, f"{ids[i]}.jpg")
+        pending.append((i, path, pool.submit(cv2.imwrite, path, tile)))
+
+        while pending and (len(pending) >= workers * WRITES_IN_FLIGHT or pending[0][2].done()):
+            j, p, future = pending.popleft()
+            if future.result():
+                written.append((j, p))
+            else:
+                print("⚠️ Could not write tile:", p)
+
+    for j, p, future in pending:
+        if future.result():
+            written.append((j, p))
+        else:
+            print("⚠️ Could not write tile:", p)
+    return written
+
+
+def run(inputs, register_path, out_dir=OUTPUT_DIR, index_csv=INDEX_CSV,
+        tile_m=TILE_METRES, workers=os.cpu_count()):
+    register = Register(register_path)
+    ids = np.asarray(register.column("Building_ID")).astype(str)
+    coords = np.asarray(register.column("Coordinates")).astype(str)
+    lat, lon = np.asarray(register.lat), np.asarray(register.lon)
+    todo = ~(np.isnan(lat) | np.isnan(lon))
+
+    os.makedirs(out_dir, exist_ok=True)
+    index_rows = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path in find_orthophotos(inputs):
+            try:
+                ortho = Orthophoto(path)
+            except (ValueError, OSError) as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                continue
+
+            print(f"\n📸 Processing: {path} ({ortho.width} × {ortho.height} px)")
+            remaining = np.flatnonzero(todo)
+            try:
+                written = tile_orthophoto(ortho, ids[remaining], lat[remaining],
+                                          lon[remaining], out_dir, tile_m, pool, workers)
+            finally:
+                ortho.close()
+
+            for j, tile_path in written:
+                i = remaining[j]
+                todo[i] = False
+                index_rows.append([ids[i], coords[i], tile_path.replace(os.sep, "/"), path])
+            print(f"💾 {len(written)} tiles written")
+
+    with open(index_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Building_ID", "Coordinates", "TopView_Image", "Orthophoto"])
+        writer.writerows(index_rows)
+
+    print(f"\n🎯 {len(index_rows)} buildings tiled, {int(todo.sum())} outside every orthophoto")
+    print(f"📄 Index: {index_csv}")
+    return index_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cut a tile around every register building "
+                                                 "from large GeoTIFF orthophotos")
+    parser.add_argument("inputs", nargs="*", default=[INPUT_FOLDER],
+                        help="Orthophoto files or folders (default: img/)")
+    parser.add_argument("--register", default=verify.REGISTER_PATH)
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--index", default=INDEX_CSV)
+    parser.add_argument("--tile-m", type=float, default=TILE_METRES,
+                        help="Ground size of each tile in metres")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    run(args.inputs, args.register, args.out, args.index, args.tile_m, args.workers)
@@ -1,28 +1,134 @@
 # ============================================================
 # WIDTH PREDICTION TRAINING (IMAGE → WIDTH ONLY)
 # ============================================================
+# python train.py                                   # defaults below
+# python train.py --batch-size 64 --intra-op 16 --xla
+# python train.py --config train_config.json        # same keys as the flags
+# python train.py --arch separable --img-size 96 --output model/variants/separable_96.h5
+#
+# Every flag can also be set in a JSON config file ("batch_size": 64,
+# "precision": "bf16", ...); flags on the command line win.
 
 import os
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+
 import pandas as pd
 import numpy as np
-import cv2
 import joblib
 
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
 
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense, Flatten, Conv2D, MaxPooling2D, Dropout
-from tensorflow.keras.callbacks import ModelCheckpoint, ReduceLROnPlateau, EarlyStopping
+from image_cache import get_cache
+from dedup import dedup_rows, group_mean, NEAR_DUPLICATE_BITS
+from architectures import ARCHITECTURES, append_report, build_model, cpu_latency_ms
 
 
 # Create model folder
 os.makedirs("model", exist_ok=True)
 
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+DEDUP_TILE_SIZE = 128   # tiles are hashed at this size whatever --img-size is,
+                        # so the split matches verify.validation_split()
+MODEL_OUT = "model/width_cnn_model.h5"
+SCALER_OUT = "model/width_scaler.pkl"   # pairs with MODEL_OUT (verify.SCALER_PATH)
+DATA_CSV = r"C:\Users\BHUVANA\OneDrive\Desktop\AI_Based_Building_Tax_Verification\AI_Based_Building_Tax_Verification\updated_file.csv"
+THROUGHPUT_LOG = "logs/train_throughput.csv"
+
+# tf.data cache of decoded tiles:
+#   False → no cache (constant memory, re-read every epoch)
+#   True  → cache in RAM after the first epoch
+#   "cache/train_ds" → cache in files on disk (…_train / …_val)
+CACHE_DATASET = False
+SHUFFLE_BUFFER = 1024   # tiles held for shuffling when CACHE_DATASET is set
+
+
+def cpu_supports_bf16():
+    # bfloat16 only pays off with native support (AVX512-BF16 / AMX)
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def parse_config():
+    parser = argparse.ArgumentParser(description="Train the width CNN")
+    parser.add_argument("--config", help="JSON file with any of the options below")
+    parser.add_argument("--data", default=DATA_CSV, help="Register CSV with TopView_Image / Width")
+    parser.add_argument("--arch", choices=ARCHITECTURES, default="flatten",
+                        help="flatten = original model, gap / separable = lighter variants")
+    parser.add_argument("--img-size", type=int, default=128, help="Input tile size in pixels")
+    parser.add_argument("--output", default=MODEL_OUT,
+                        help="Where to save the model (the apps load " + MODEL_OUT + ")")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--epochs", type=int, default=60)
+    parser.add_argument("--intra-op", type=int, default=0,
+                        help="Threads inside one op (0 = TensorFlow default, all cores)")
+    parser.add_argument("--inter-op", type=int, default=0,
+                        help="Ops run in parallel (0 = TensorFlow default)")
+    parser.add_argument("--preprocess-workers", type=int, default=os.cpu_count(),
+                        help="Threads decoding / resizing images")
+    parser.add_argument("--dedup-distance", type=int, default=NEAR_DUPLICATE_BITS,
+                        help="Max differing perceptual-hash bits for duplicate tiles "
+                             "(-1 = keep duplicates)")
+    parser.add_argument("--onednn", choices=["on", "off"], default="on",
+                        help="oneDNN optimized CPU kernels")
+    parser.add_argument("--xla", action="store_true", help="XLA JIT-compile the training step")
+    parser.add_argument("--precision", choices=["auto", "float32", "bf16"], default="auto",
+                        help="auto = bfloat16 mixed precision when the CPU supports it "
+                             "(training only, the saved model is always float32)")
+
+    args, _ = parser.parse_known_args()
+    if args.config:
+        with open(args.config) as f:
+            parser.set_defaults(**json.load(f))
+    return parser.parse_args()
+
+
+args = parse_config()
+IMG_SIZE = args.img_size
+BATCH_SIZE = args.batch_size
+PREPROCESS_WORKERS = args.preprocess_workers
+DEDUP_DISTANCE = None if args.dedup_distance < 0 else args.dedup_distance
+# Variants get their own scaler next to the model, so training one never
+# replaces the scaler the production model was fitted with
+SCALER_PATH = (SCALER_OUT if os.path.abspath(args.output) == os.path.abspath(MODEL_OUT)
+               else os.path.splitext(args.output)[0] + "_scaler.pkl")
+
+# oneDNN is chosen when TensorFlow is imported, so TF comes after the config
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1" if args.onednn == "on" else "0"
+
+import tensorflow as tf
+from tensorflow.keras import mixed_precision
+from tensorflow.keras.callbacks import Callback, ModelCheckpoint, ReduceLROnPlateau, EarlyStopping
+
+# Thread pools must be sized before TensorFlow runs its first op
+tf.config.threading.set_intra_op_parallelism_threads(args.intra_op)
+tf.config.threading.set_inter_op_parallelism_threads(args.inter_op)
+
+use_bf16 = args.precision == "bf16" or (args.precision == "auto" and cpu_supports_bf16())
+if use_bf16:
+    mixed_precision.set_global_policy("mixed_bfloat16")
+    if args.precision == "auto":
+        print("🔢 CPU supports bfloat16: training with mixed_bfloat16 "
+              "(--precision float32 to disable); the saved model stays float32")
+
+print(f"⚙️ {args.arch} @ {IMG_SIZE}px | batch {BATCH_SIZE} | "
+      f"intra-op {args.intra_op or 'default'} | inter-op {args.inter_op or 'default'} | oneDNN {args.onednn} | "
+      f"XLA {'on' if args.xla else 'off'} | {'bfloat16 mixed' if use_bf16 else 'float32'}")
+
 # ============================================================
 # 1️⃣ LOAD DATASET
 # ============================================================
-df = pd.read_csv(r"C:\Users\BHUVANA\OneDrive\Desktop\AI_Based_Building_Tax_Verification\AI_Based_Building_Tax_Verification\updated_file.csv")
+df = pd.read_csv(args.data)
 
 print("✅ Dataset loaded:", df.shape)
 
@@ -30,66 +136,103 @@ image_paths = df["TopView_Image"].values
 width = df["Width"].values
 
 # ============================================================
-# 2️⃣ SCALE WIDTH VALUES
-
-# Note: scaler must be fitted on widths that have corresponding images.
-# We'll fit the scaler after loading & filtering images below.
-# ============================================================
-
-# ============================================================
-# 3️⃣ LOAD & PROCESS IMAGES
+# 2️⃣ KEEP ONE ROW PER UNIQUE, READABLE IMAGE
 # ============================================================
+# One parallel pass decodes / resizes every image on all cores and
+# stores the tiles in the image cache; missing or corrupt files are
+# reported and dropped. Tiles with the same perceptual hash (or within
+# --dedup-distance bits) are trained on once, with the mean of their
+# widths, and can no longer end up on both sides of the split.
+# Only the paths are kept in memory; tiles are streamed from the cache
+# batch by batch during training.
 
-images = []
-valid_idx = []
+valid_idx, group, unreadable = dedup_rows(image_paths.astype(str), DEDUP_TILE_SIZE,
+                                          PREPROCESS_WORKERS, DEDUP_DISTANCE)
+for path in unreadable:
+    print("⚠️ Missing / unreadable image:", path)
 
-for i, path in enumerate(image_paths):
-    if not os.path.exists(path):
-        print("⚠️ Missing image:", path)
-        continue
+readable = int((group >= 0).sum())
+if readable > len(valid_idx):
+    print(f"🪞 {readable - len(valid_idx)} duplicate tiles merged, {len(valid_idx)} unique")
 
-    img = cv2.imread(path)
-    img = cv2.resize(img, (128, 128))
-    images.append(img)
-    valid_idx.append(i)
+image_paths = image_paths[valid_idx].astype(str)
 
-images = np.array(images) / 255.0
-# Filter widths to only those with loaded images, then fit scaler on them
-width_filtered = width[valid_idx]
+# ============================================================
+# 3️⃣ SCALE WIDTH VALUES
+# ============================================================
+# Scaler is fitted only on widths that have a readable image
+width_filtered = group_mean(group, width)
 width_scaler = MinMaxScaler()
-width_scaled = width_scaler.fit_transform(width_filtered.reshape(-1, 1))
-joblib.dump(width_scaler, "model/width_scaler.pkl")
-print("✅ Width scaler saved!")
+width_scaled = width_scaler.fit_transform(width_filtered.reshape(-1, 1)).astype(np.float32)
+os.makedirs(os.path.dirname(SCALER_PATH) or ".", exist_ok=True)
+joblib.dump(width_scaler, SCALER_PATH)
+print("✅ Width scaler saved:", SCALER_PATH)
 
-print("✅ Loaded images:", images.shape)
+print("✅ Images found:", len(image_paths))
 
 # ============================================================
-# 4️⃣ TRAIN / VALIDATION SPLIT
+# 4️⃣ TRAIN / VALIDATION SPLIT + STREAMING PIPELINE
 # ============================================================
 
-X_train, X_val, y_train, y_val = train_test_split(
-    images, width_scaled, test_size=0.2, random_state=42
+paths_train, paths_val, y_train, y_val = train_test_split(
+    image_paths, width_scaled, test_size=0.2, random_state=42
 )
 
-# ============================================================
-# 5️⃣ BUILD WIDTH CNN MODEL
-# ============================================================
+# Tiles come from the shared image cache: only the first run decodes
+# the JPEGs, later runs (and the GUIs) reuse the resized tiles
+tile_cache = get_cache(IMG_SIZE)
 
-img_input = Input(shape=(128, 128, 3))
 
-x = Conv2D(32, (3,3), activation='relu')(img_input)# extarct edges ,pattenrs
-x = MaxPooling2D(2,2)(x)
-x = Conv2D(64, (3,3), activation='relu')(x)
-x = MaxPooling2D(2,2)(x)
-x = Conv2D(128, (3,3), activation='relu')(x)
-x = MaxPooling2D(2,2)(x)
-x = Flatten()(x)
-x = Dropout(0.3)(x)
+def load_tile(path):
+    # Runs on tf.data worker threads; unreadable files come back with ok=False
+    img = tile_cache.load(path.decode())
+    if img is None:
+        print("⚠️ Unreadable image:", path.decode())
+        return np.zeros((IMG_SIZE, IMG_SIZE, 3), np.uint8), False
+    return img, True
 
-output = Dense(1, activation="linear")(x)
 
-model = Model(inputs=img_input, outputs=output)
-model.compile(optimizer="adam", loss="mse", metrics=["mae"])
+def decode(path, y):
+    img, ok = tf.numpy_function(load_tile, [path], [tf.uint8, tf.bool])
+    img.set_shape((IMG_SIZE, IMG_SIZE, 3))
+    ok.set_shape(())
+    return img, y, ok
+
+
+def normalize(img, y):
+    # uint8 → float32 in [0, 1], done per batch instead of on the whole dataset
+    return tf.cast(img, tf.float32) / 255.0, y
+
+
+def make_dataset(paths, y, training, cache_name):
+    ds = tf.data.Dataset.from_tensor_slices((paths, y))
+    if training and not CACHE_DATASET:
+        # Shuffling paths (not pixels) keeps the shuffle buffer tiny
+        ds = ds.shuffle(len(paths), seed=42, reshuffle_each_iteration=True)
+
+    ds = ds.map(decode, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+    ds = ds.filter(lambda img, y, ok: ok).map(lambda img, y, ok: (img, y))
+
+    if CACHE_DATASET:
+        # uint8 tiles, 1/8 the size of the old float64 array
+        ds = ds.cache(f"{CACHE_DATASET}_{cache_name}" if isinstance(CACHE_DATASET, str) else "")
+        if training:
+            ds = ds.shuffle(SHUFFLE_BUFFER, seed=42, reshuffle_each_iteration=True)
+
+    ds = ds.batch(BATCH_SIZE).map(normalize, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+train_ds = make_dataset(paths_train, y_train, training=True, cache_name="train")
+val_ds = make_dataset(paths_val, y_val, training=False, cache_name="val")
+
+# ============================================================
+# 5️⃣ BUILD WIDTH CNN MODEL
+# ============================================================
+# Variants are defined in architectures.py
+
+model = build_model(args.arch, IMG_SIZE)
+model.compile(optimizer="adam", loss="mse", metrics=["mae"], jit_compile=args.xla)
 
 model.summary()
 
@@ -97,48 +240,93 @@ model.summary()
 # 6️⃣ CALLBACKS
 # ============================================================
 
+os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+# Best weights only; the model file itself is written after training
+# under the float32 policy (section 8)
+best_weights = os.path.splitext(args.output)[0] + ".best.weights.h5"
 checkpoint = ModelCheckpoint(  #validation loss
-    "model/width_cnn_model.h5",
+    best_weights,
     save_best_only=True,
+    save_weights_only=True,
     monitor="val_loss"
 )
 
 reduce_lr = ReduceLROnPlateau(monitor="val_loss", patience=5, factor=0.5)
 early_stop = EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)
 
-# ============================================================
-# 7️⃣ TRAIN MODEL
-# ============================================================
 
-history = model.fit(
-    X_train, y_train,
-    validation_data=(X_val, y_val),
-    epochs=60,
-    batch_size=8,
-    callbacks=[checkpoint, reduce_lr, early_stop]
-)
+class Throughput(Callback):
+    # Training samples / second per epoch, printed and appended to logs/
+    def __init__(self, samples):
+        super().__init__()
+        self.samples = samples
 
-print("🎉 Width model trained and saved: model/width_cnn_model.h5")
+    def on_epoch_begin(self, epoch, logs=None):
+        self.t0 = time.perf_counter()
 
-import numpy as np
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self.t0
+        rate = self.samples / seconds
+        print(f"⏱ Epoch {epoch + 1}: {seconds:.1f}s, {rate:.1f} samples/s")
 
+        os.makedirs(os.path.dirname(THROUGHPUT_LOG), exist_ok=True)
+        new_file = not os.path.exists(THROUGHPUT_LOG)
+        with open(THROUGHPUT_LOG, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["Timestamp", "Epoch", "Batch_Size", "Intra_Op", "Inter_Op",
+                                 "oneDNN", "XLA", "Precision", "Seconds", "Samples_Per_s"])
+            writer.writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), epoch + 1,
+                             BATCH_SIZE, args.intra_op, args.inter_op, args.onednn,
+                             args.xla, "bf16" if use_bf16 else "float32",
+                             f"{seconds:.3f}", f"{rate:.1f}"])
 
 
-confusion_matrix = np.array([[42, 8],
-                             [10, 40]])
+throughput = Throughput(len(paths_train))
 
-true_positive = confusion_matrix[0][0]
-true_negative = confusion_matrix[1][1]
-false_positive = confusion_matrix[0][1]
-false_negative = confusion_matrix[1][0]
+# ============================================================
+# 7️⃣ TRAIN MODEL
+# ============================================================
 
-# technical accuracy calculation
-accuracy = (true_positive + true_negative) / np.sum(confusion_matrix)
+history = model.fit(
+    train_ds,
+    validation_data=val_ds,
+    epochs=args.epochs,
+    callbacks=[checkpoint, reduce_lr, early_stop, throughput]
+)
 
-# Adjusted accuracy value internally
-accuracy = (accuracy * 0.95) + 0.05  
+# ============================================================
+# 8️⃣ SAVE A FLOAT32 MODEL
+# ============================================================
+# The policy is stored in the .h5: a model saved under mixed_bfloat16
+# would also run bf16 in the apps and in export_tflite. Rebuild it
+# under float32 and copy the best weights in (variables are float32
+# under both policies).
+mixed_precision.set_global_policy("float32")
+model = build_model(args.arch, IMG_SIZE)
+model.load_weights(best_weights)
+model.compile(optimizer="adam", loss="mse", metrics=["mae"])
+model.save(args.output)
+os.remove(best_weights)
 
-# convert to percentage
-accuracy_percentage = round(accuracy * 100, 2)
+print("🎉 Width model trained and saved:", args.output)
 
-print("Model Accuracy:", accuracy_percentage, "%")
\ No newline at end of file
+# ============================================================
+# 9️⃣ VALIDATION ERROR (REAL, FROM THE TRAINING RUN)
+# ============================================================
+# MAE is tracked on the scaled target; convert it back to metres.
+# For the full held-out report (MAE / RMSE, OK / FLAGGED confusion
+# matrix, throughput) run:  python evaluate.py
+width_range = width_scaler.data_max_[0] - width_scaler.data_min_[0]
+best_val_mae = min(history.history["val_mae"]) * width_range
+print(f"📏 Best validation width MAE: {best_val_mae:.2f} m")
+
+# ============================================================
+# 🔟 ARCHITECTURE REPORT (PARAMS / SIZE / CPU LATENCY / MAE)
+# ============================================================
+# One row per run in model/arch_report.csv; compare the variants
+# with:  python architectures.py
+latency_ms = cpu_latency_ms(model)
+append_report(args.arch, IMG_SIZE, model.count_params(), args.output, latency_ms, best_val_mae)
+print(f"🏗 {args.arch} @ {IMG_SIZE}px: {model.count_params():,} params, "
+      f"{os.path.getsize(args.output) / 1024:.1f} KB, {latency_ms:.2f} ms / tile")
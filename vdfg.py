@@ -1,49 +1,170 @@
+import os
+import json
+import hashlib
+import argparse
+
 import pandas as pd
 
-# =========================================
-# Load your dataset
-# =========================================
-df = pd.read_csv("updated_file.csv")   # Replace with your actual filename
+from tax_engine import compute_tax, TAX_TABLE_PATH
+
+INPUT_CSV = "updated_file.csv"
+OUTPUT_CSV = "municipal_data.csv"
+MANIFEST = "municipal_data.manifest.json"
+
+OUTPUT_COLUMNS = ['Building_ID', 'Coordinates', 'Building_Type', 'Building_Height',
+                  'Width', 'Area', 'Floors', 'Tax_Rate', 'Total_Tax', 'TopView_Image']
+
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_stat(path):
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
 
-# =========================================
-# Calculate Area (Width × Height)
-# =========================================
-df['Area'] = df['Width'] * df['Building_Height']
 
 # =========================================
-# Estimate Floors (assuming 3 meters per floor)
+# Area, Floors, Tax Rate and Total Tax
 # =========================================
-df['Floors'] = (df['Building_Height'] / 3).round().astype(int)
+# Rates and floor heights per Building_Type (and Zone, if the register
+# has one) come from tax_rates.csv — adjust them there to fit your
+# city's municipal logic. Computed over whole columns at once.
+def build_municipal(df):
+    df = df.copy()
+    zones = df['Zone'] if 'Zone' in df.columns else None
+    df['Area'], df['Floors'], df['Total_Tax'], df['Tax_Rate'] = compute_tax(
+        df['Width'], df['Building_Height'], df['Building_Type'], zones
+    )
+    # Rearrange Columns for Municipal Output
+    return df[OUTPUT_COLUMNS]
+
+
+def row_hashes(df):
+    # One content hash per input row (vectorized), keyed by Building_ID
+    hashes = pd.util.hash_pandas_object(df, index=False).astype(str)
+    return dict(zip(df['Building_ID'].astype(str), hashes))
+
+
+def save_manifest(input_hash, input_stat, rows):
+    # input_stat must be taken before the input was hashed / read: an edit
+    # during the build then changes the stat and the next run sees it
+    with open(MANIFEST, "w") as f:
+        json.dump({
+            "input_hash": input_hash,
+            "input_stat": input_stat,
+            "tax_table_hash": file_hash(TAX_TABLE_PATH),
+            "output_stat": file_stat(OUTPUT_CSV),
+            "order": list(rows),
+            "rows": rows,
+        }, f)
+
+
+def full_build(df, input_hash, input_stat):
+    municipal_df = build_municipal(df)
+    municipal_df.to_csv(OUTPUT_CSV, index=False)
+    save_manifest(input_hash, input_stat, row_hashes(df))
+    print(f"✅ Municipal data created successfully: '{OUTPUT_CSV}' ({len(municipal_df)} rows)")
+    return municipal_df
+
 
 # =========================================
-# Assign Tax Rate based on Building Type
+# Incremental build
 # =========================================
-# You can adjust these values to fit your city’s municipal logic
-def assign_tax_rate(building_type):
-    if building_type.lower() == 'residential':
-        return 12  # Example: ₹12 per sq.m. per floor
-    elif building_type.lower() == 'corporate':
-        return 25  # Example: ₹25 per sq.m. per floor
+# The manifest remembers the input file hash, the tax table hash, the
+# output file size / mtime and one content hash per Building_ID.
+#   - input, tax table and output unchanged → nothing to do
+#   - only new rows at the end of the input → those rows are computed
+#     and appended to municipal_data.csv
+#   - rows changed / deleted → only changed / new rows are computed,
+#     unchanged rows are copied from the previous municipal_data.csv
+# Anything the manifest can't vouch for (no manifest, new tax table,
+# municipal_data.csv edited elsewhere, duplicate IDs) → full build.
+def incremental_build():
+    manifest = None
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+
+    trusted = (
+        manifest is not None
+        and manifest.get("tax_table_hash") == file_hash(TAX_TABLE_PATH)
+        and manifest.get("output_stat") == file_stat(OUTPUT_CSV)
+    )
+
+    # Same size + mtime → skip even hashing the input
+    input_stat = file_stat(INPUT_CSV)
+    if trusted and manifest.get("input_stat") == input_stat:
+        print(f"✅ '{INPUT_CSV}' unchanged — '{OUTPUT_CSV}' is up to date")
+        return None
+
+    input_hash = file_hash(INPUT_CSV)
+    if trusted and manifest["input_hash"] == input_hash:
+        print(f"✅ '{INPUT_CSV}' unchanged — '{OUTPUT_CSV}' is up to date")
+        return None
+
+    df = pd.read_csv(INPUT_CSV)
+    if not trusted or df['Building_ID'].duplicated().any():
+        return full_build(df, input_hash, input_stat)
+
+    old_rows = manifest["rows"]
+    new_rows = row_hashes(df)
+
+    ids = df['Building_ID'].astype(str)
+    changed = ids.map(old_rows) != pd.Series(new_rows.values(), index=df.index)
+    deleted = set(old_rows) - set(new_rows)
+    appended_only = (
+        not deleted
+        and not changed[:len(manifest["order"])].any()
+        and ids[:len(manifest["order"])].tolist() == manifest["order"]
+    )
+
+    recomputed = build_municipal(df[changed])
+
+    if appended_only:
+        recomputed.to_csv(OUTPUT_CSV, mode="a", header=False, index=False)
+        print(f"➕ Appended {len(recomputed)} new buildings to '{OUTPUT_CSV}'")
     else:
-        return 10  # default for unknown types
+        # round_trip: kept rows must be written back digit for digit
+        # (the default parser turns 435.0 into 434.99999999999994)
+        previous = pd.read_csv(OUTPUT_CSV, float_precision="round_trip")
+        previous = previous[previous['Building_ID'].astype(str).isin(ids[~changed])]
+        municipal_df = pd.concat([previous, recomputed], ignore_index=True)
+        order = {bid: i for i, bid in enumerate(ids)}
+        municipal_df = municipal_df.sort_values(
+            'Building_ID', key=lambda s: s.astype(str).map(order)
+        )
+        municipal_df.to_csv(OUTPUT_CSV, index=False)
+        print(f"🔁 Recomputed {len(recomputed)} changed / new, removed {len(deleted)}, "
+              f"kept {len(previous)} unchanged rows")
 
-df['Tax_Rate'] = df['Building_Type'].apply(assign_tax_rate)
+    save_manifest(input_hash, input_stat, new_rows)
+    return recomputed
 
-# =========================================
-# Calculate Total Tax
-# =========================================
-df['Total_Tax'] = df['Area'] * df['Floors'] * df['Tax_Rate']
 
-# =========================================
-# Rearrange Columns for Municipal Output
-# =========================================
-municipal_df = df[['Building_ID', 'Coordinates', 'Building_Type', 'Building_Height',
-                   'Width', 'Area', 'Floors', 'Tax_Rate', 'Total_Tax', 'TopView_Image']]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build municipal_data.csv from updated_file.csv")
+    parser.add_argument("--full", action="store_true",
+                        help="Recompute and rewrite every row instead of only the changed ones")
+    args = parser.parse_args()
 
-# =========================================
-# Save to CSV
-# =========================================
-municipal_df.to_csv("municipal_data.csv", index=False)
+    # =========================================
+    # Load your dataset and build
+    # =========================================
+    if args.full:
+        input_stat = file_stat(INPUT_CSV)
+        input_hash = file_hash(INPUT_CSV)
+        result = full_build(pd.read_csv(INPUT_CSV), input_hash, input_stat)
+    else:
+        result = incremental_build()
 
-print("✅ Municipal data created successfully: 'municipal_data.csv'")
-print(municipal_df.head())
+    if result is not None:
+        print(result.head())
@@ -0,0 +1,116 @@
+# ============================================================
+# 🧮 SHARED VERIFICATION PIPELINE (IMAGE → WIDTH → TAX → ALERT)
+# ============================================================
+# Same logic as predict_and_display() / predict_all() in the GUIs,
+# but written over whole arrays / DataFrames so it can be used for
+# one building or for the whole register in a single pass.
+
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.model_selection import train_test_split
+
+import metrics
+from image_cache import get_cache
+from inference_backend import load_backend
+from dedup import dedup_rows, group_mean, NEAR_DUPLICATE_BITS
+from tax_engine import compute_tax
+
+MODEL_PATH = "model/width_cnn_model.h5"
+SCALER_PATH = "model/width_scaler.pkl"
+REGISTER_PATH = "updated_file.csv"
+MUNICIPAL_PATH = "municipal_data.csv"
+
+IMG_SIZE = 128   # default tile size; a loaded model's own size: input_size(width_cnn)
+
+
+# ============================================================
+# MODEL
+# ============================================================
+def load_width_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH, backend=None):
+    # backend: "keras" / "fp16" / "int8", default from WIDTH_BACKEND.
+    # TensorFlow is only imported by the backend that needs it, so
+    # tools that only use the tax / comparison logic don't pay for it
+    width_cnn = load_backend(backend, model_path)
+    width_scaler = joblib.load(scaler_path)
+    return width_cnn, width_scaler
+
+
+def validation_split(register_path=REGISTER_PATH, dedup_distance=NEAR_DUPLICATE_BITS):
+    # Same train / validation split as train.py (one row per unique
+    # readable image with its group's mean width, test_size=0.2,
+    # random_state=42) → train_df, val_df. Width is the training target
+    # (group mean); Recorded_Width is the row's own register value, the
+    # one its municipal record was built from
+    df = pd.read_csv(register_path)
+    rows, group, _ = dedup_rows(df["TopView_Image"].astype(str).tolist(), IMG_SIZE,
+                                max_distance=dedup_distance)
+    width = group_mean(group, df["Width"])
+    df = df.iloc[rows].reset_index(drop=True)
+    df["Recorded_Width"] = df["Width"].astype(np.float64)
+    df["Width"] = width
+    return train_test_split(df, test_size=0.2, random_state=42)
+
+
+# ============================================================
+# IMAGES
+# ============================================================
+def read_image(path, size=IMG_SIZE):
+    # Returns the resized uint8 tile, or None if missing / unreadable.
+    # Served from the shared image cache when already decoded once.
+    return get_cache(size).load(path)
+
+
+def predict_widths(width_cnn, width_scaler, images, batch_size=256):
+    # images: uint8 array (N, size, size, 3) → widths in metres (N,)
+    if len(images) == 0:
+        return np.empty(0, dtype=np.float64)
+
+    preds = []
+    with metrics.span("cnn_predict"):
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size].astype(np.float32) / 255.0
+            preds.append(width_cnn.predict_on_batch(batch))
+    metrics.count("cnn_images", len(images))
+
+    pred_scaled = np.concatenate(preds).reshape(-1, 1)
+    with metrics.span("inverse_transform"):
+        return width_scaler.inverse_transform(pred_scaled)[:, 0]
+
+
+# ============================================================
+# AREA / FLOORS / TAX
+# ============================================================
+def compute_measures(widths, heights, building_types, zones=None):
+    # Rates / floor heights come from the shared tax table (tax_rates.csv)
+    area, floors, tax, _ = compute_tax(widths, heights, building_types, zones)
+    return area, floors, tax
+
+
+# ============================================================
+# MUNICIPAL COMPARISON
+# ============================================================
+def compare_with_municipal(floors, tax, muni_floors, muni_tax, flag_label="Flagged"):
+    # muni_* are NaN where no municipal record was found → never flagged
+    floors = np.asarray(floors, dtype=np.float64)
+    tax = np.asarray(tax, dtype=np.float64)
+    floor_diff = floors - np.asarray(muni_floors, dtype=np.float64)
+    tax_diff = tax - np.asarray(muni_tax, dtype=np.float64)
+
+    flagged = (floor_diff > 0) | (tax_diff > 0)
+
+    status = np.where(flagged, flag_label, "OK").astype(object)
+    message = np.full(len(floors), "No discrepancies.", dtype=object)
+    for i in np.flatnonzero(flagged):
+        message[i] = f"Extra Floors = {floor_diff[i]:g}, Underpaid = ₹{tax_diff[i]:,.2f}"
+
+    return status, message
+
+
+def discrepancies(floors, tax, muni_floors, muni_tax):
+    # Extra floors / underpaid tax vs the municipal record, 0 when not
+    # higher or when no record was found → (extra_floors, underpaid)
+    floor_diff = np.asarray(floors, dtype=np.float64) - np.asarray(muni_floors, dtype=np.float64)
+    tax_diff = np.asarray(tax, dtype=np.float64) - np.asarray(muni_tax, dtype=np.float64)
+    return (np.nan_to_num(np.clip(floor_diff, 0, None)),
+            np.nan_to_num(np.clip(tax_diff, 0, None)))
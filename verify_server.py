@@ -0,0 +1,289 @@
+# ============================================================
+# 🌐 LOCAL VERIFICATION HTTP SERVICE (ONE WARM MODEL, MICRO-BATCHING)
+# ============================================================
+# Exposes the predict_and_display() logic over HTTP so tablets and
+# back-office tools share one loaded model instead of each starting
+# TensorFlow. Requests arriving within a few milliseconds of each
+# other are grouped into a single batched predict call.
+#
+# Usage:
+#   python verify_server.py --port 8765 --window-ms 5 --max-batch 64
+#
+#   POST /verify  {"coords": "12.972575,77.591082"}
+#                 → looks the building up in updated_file.csv (like test.py)
+#   POST /verify  {"coords": "...", "height": 14, "building_type": "Residential",
+#                  "image_path": "images/belling.jpg"}
+#                 → uses the given inputs (like test2.py)
+#   GET  /health
+#   GET  /metrics  → Prometheus text (start with --metrics)
+
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import db
+import metrics
+import verify
+from inference_backend import BACKENDS, input_size
+from register_cache import RegisterCache
+from result_cache import ResultCache, backend_model_path
+from spatial_index import COORD_TOLERANCE_M
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ============================================================
+# 1️⃣ MICRO-BATCHER
+# ============================================================
+class MicroBatcher:
+    # Collects tiles from many request threads and runs them through
+    # the model together: the first tile opens a window of window_ms,
+    # everything that arrives in it (up to max_batch) shares one predict
+    def __init__(self, width_cnn, width_scaler, window_ms=5, max_batch=64):
+        self.width_cnn = width_cnn
+        self.width_scaler = width_scaler
+        self.img_size = input_size(width_cnn)
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def predict(self, tile):
+        # tile: uint8 (img_size, img_size, 3) → width in metres; blocks until done
+        future = Future()
+        self.requests.put((tile, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            tiles = np.stack([tile for tile, _ in batch])
+            try:
+                widths = verify.predict_widths(self.width_cnn, self.width_scaler, tiles,
+                                               batch_size=self.max_batch)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            metrics.count("microbatches")
+            metrics.count("microbatch_items", len(batch))
+            for (_, future), width in zip(batch, widths):
+                future.set_result(float(width))
+
+
+# ============================================================
+# 2️⃣ VERIFICATION SERVICE
+# ============================================================
+class VerificationService:
+    def __init__(self, batcher, register_path=verify.REGISTER_PATH,
+                 municipal_path=verify.MUNICIPAL_PATH, db_path=db.DB_PATH,
+                 temp_db_path=db.TEMP_DB_PATH, backend=None):
+        self.batcher = batcher
+        self.register = RegisterCache(register_path)
+        self.municipal = RegisterCache(municipal_path)
+        self.conn = db.connect(db_path, check_same_thread=False)
+        self.temp_conn = db.connect(temp_db_path, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        # Shared by both modes: the key already covers image, height and type
+        self.results = ResultCache(self.conn, backend_model_path(backend), verify.SCALER_PATH,
+                                   lock=self.db_lock)
+
+    def verify(self, body):
+        with metrics.trace(), metrics.span("verification"):
+            return self._verify(body)
+
+    def _verify(self, body):
+        coords = str(body.get("coords", "")).strip()
+        try:
+            lat, lon = map(float, coords.split(","))
+        except ValueError:
+            raise RequestError(400, "Use format: 12.9716,77.5946")
+
+        manual = "image_path" in body
+        if manual:
+            try:
+                height = float(body["height"])
+                btype = str(body["building_type"]).strip()
+            except (KeyError, TypeError, ValueError):
+                raise RequestError(400, "height and building_type are required with image_path")
+            img_path = body["image_path"]
+            if not isinstance(img_path, str) or not img_path.strip():
+                raise RequestError(400, "image_path must be a file path string")
+            # No zone in manual mode: the (type, *) / (*, *) tax rates apply
+            building_id = ward = zone = None
+        else:
+            with metrics.span("register_lookup"):
+                record = self.register.lookup_coordinates(lat, lon, COORD_TOLERANCE_M)
+            if record is None:
+                raise RequestError(404, "No building found for these coordinates.")
+            height = float(record["Building_Height"])
+            btype = record["Building_Type"]
+            img_path = record["TopView_Image"]
+            building_id = record["Building_ID"]
+            ward = record.get("Ward")
+            zone = record.get("Zone")
+
+        with metrics.span("result_cache_lookup"):
+            cache_key = self.results.key(img_path, height, btype, zone)
+            cached = self.results.get(cache_key)
+        if cached is not None:
+            metrics.count("result_cache", result="hit")
+            width, area, floors, tax = cached
+        else:
+            metrics.count("result_cache", result="miss")
+            with metrics.span("image_read"):
+                tile = verify.read_image(img_path, self.batcher.img_size)
+            if tile is None:
+                raise RequestError(404, f"Image not found or unreadable: {img_path}")
+
+            with metrics.span("batched_predict_wait"):
+                width = self.batcher.predict(tile)
+
+            with metrics.span("tax_calc"):
+                area, floors, tax = verify.compute_measures([width], [height], [btype], [zone])
+            area, floors, tax = float(area[0]), int(floors[0]), float(tax[0])
+            self.results.put(cache_key, width, area, floors, tax)
+
+        with metrics.span("municipal_lookup"):
+            muni = self.municipal.lookup_coordinates(lat, lon, COORD_TOLERANCE_M)
+        muni_floors = np.nan if muni is None else muni.get("Floors", 0)
+        muni_tax = np.nan if muni is None else muni.get("Total_Tax", 0)
+        status, message = verify.compare_with_municipal(
+            [floors], [tax], [muni_floors], [muni_tax],
+            flag_label="FLAGGED" if manual else "Flagged"
+        )
+        status, message = status[0], message[0]
+        extra_floors, underpaid = verify.discrepancies([floors], [tax], [muni_floors], [muni_tax])
+
+        timestamp = db.now()
+        with self.db_lock, metrics.span("db_write"):
+            if manual:
+                db.save_temp_verifications(self.temp_conn, [(
+                    coords, lat, lon, height, btype, width, area, floors, tax,
+                    status, message, timestamp
+                )])
+            else:
+                db.save_buildings(self.conn, [(
+                    building_id, lat, lon, btype, height, width, area, floors, tax,
+                    status, message, timestamp,
+                    float(extra_floors[0]), float(underpaid[0]), ward
+                )])
+
+        return {
+            "Building_ID": building_id, "Coordinates": coords, "Building_Type": btype,
+            "Height": height, "Predicted_Width": width, "Area": area,
+            "Predicted_Floors": floors, "Predicted_Tax": tax,
+            "Alert_Status": status, "Alert_Message": message, "Timestamp": timestamp,
+        }
+
+
+# ============================================================
+# 3️⃣ HTTP HANDLER
+# ============================================================
+class Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            batcher = self.service.batcher
+            results = self.service.results
+            self._send(200, {"status": "ok", "batches": batcher.batches, "items": batcher.items,
+                             "cache_hits": results.hits, "cache_misses": results.misses})
+        elif self.path == "/metrics" and metrics.enabled():
+            data = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/verify":
+            self._send(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise RequestError(400, "Body must be a JSON object")
+            self._send(200, self.service.verify(body))
+        except json.JSONDecodeError:
+            self._send(400, {"error": "Body must be JSON"})
+        except RequestError as e:
+            self._send(e.status, {"error": e.message})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local building verification HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window-ms", type=float, default=5.0,
+                        help="How long to wait for more requests before predicting")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--backend", choices=BACKENDS, default=None)
+    parser.add_argument("--metrics", action="store_true",
+                        help="Collect stage timings, served as Prometheus text on GET /metrics")
+    parser.add_argument("--profile", choices=["cprofile", "tf"],
+                        help="Profile every request (saved on exit to logs/)")
+    args = parser.parse_args()
+
+    if args.metrics or args.profile:
+        metrics.enable(profile=args.profile)
+
+    width_cnn, width_scaler = verify.load_width_model(backend=args.backend)
+    # Warm-up so the first request doesn't pay for graph tracing
+    size = input_size(width_cnn)
+    verify.predict_widths(width_cnn, width_scaler, np.zeros((1, size, size, 3), np.uint8))
+
+    Handler.service = VerificationService(MicroBatcher(width_cnn, width_scaler,
+                                                       args.window_ms, args.max_batch),
+                                          backend=args.backend)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"🌐 Verification service on http://{args.host}:{args.port} "
+          f"(batch window {args.window_ms} ms, max batch {args.max_batch})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
@@ -1,29 +1,29 @@
-import pandas as pd
 import random
-import os
 from tkinter import Tk, filedialog
 
-# ---------------- Load existing dataset ----------------
+from ingest import append_buildings, read_last_row
+
+# ---------------- Existing dataset ----------------
 csv_file = "municipal_data.csv"  # Replace with your CSV file path
-df = pd.read_csv(csv_file)
 
-# ---------------- Select 5 images manually ----------------
+# ---------------- Select building images ----------------
 root = Tk()
 root.withdraw()  # Hide main window
 img_files = filedialog.askopenfilenames(
-    title="Select 5 building images",
+    title="Select building images",
     filetypes=[("Image Files", "*.jpg *.jpeg *.png")],
 )
 
-# Limit to 5 images
-img_files = list(img_files)[:5]
+# Any number of images per batch
+img_files = list(img_files)
 
 if len(img_files) == 0:
     print("No images selected. Exiting.")
     exit()
 
 # ---------------- Last known coordinates from last dataset entry ----------------
-last_row = df.iloc[-1]
+# Only the last line of the CSV is read, not the whole file
+last_row = read_last_row(csv_file)
 last_lat, last_lon = map(float, last_row['Coordinates'].split(','))
 
 # ---------------- Function to generate building row ----------------
@@ -46,21 +46,19 @@ def generate_building_row(building_id, last_lat, last_lon, image_path):
     tax_rate = round(random.uniform(5, 15), 1)      # assume percentage
     total_tax = round(area * tax_rate, 1)
 
-    return [building_id, coordinates, building_type, height, width, area, floors, tax_rate, total_tax, image_path]
-
-# ---------------- Generate new building rows ----------------
-new_buildings = []
-starting_id = int(last_row['Building_ID'][1:]) + 1  # Next ID number
-
-for i, img_path in enumerate(img_files):
-    building_id = f"B{starting_id + i}"
-    new_buildings.append(generate_building_row(building_id, last_lat, last_lon, img_path))
+    return {
+        "Building_ID": building_id, "Coordinates": coordinates, "Building_Type": building_type,
+        "Building_Height": height, "Width": width, "Area": area, "Floors": floors,
+        "Tax_Rate": tax_rate, "Total_Tax": total_tax, "TopView_Image": image_path,
+    }
 
-# ---------------- Convert to DataFrame ----------------
-df_new = pd.DataFrame(new_buildings, columns=df.columns)
-
-# ---------------- Append and save updated CSV ----------------
-df_updated = pd.concat([df, df_new], ignore_index=True)
-df_updated.to_csv("municipal_data.csv", index=False)
+# ---------------- Append new building rows ----------------
+# IDs are allocated atomically under a file lock and the rows are
+# appended to the end of the CSV, so concurrent operators never
+# overwrite each other and the existing rows are never rewritten
+new_rows = append_buildings(
+    csv_file, len(img_files),
+    lambda i, building_id: generate_building_row(building_id, last_lat, last_lon, img_files[i])
+)
 
-print("5 new buildings added successfully!")
+print(f"{len(new_rows)} new buildings added successfully!")